@@ -3,7 +3,19 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.safestring import mark_safe
 from django.utils.translation import ugettext_lazy as _
 
-from .models import Answer, Question, SimpleSurvey, SimpleSurveyResult, User, UserProfile
+from .models import (
+    Answer,
+    Question,
+    QuestionCategory,
+    QuestionStats,
+    SimpleSurvey,
+    SimpleSurveyResult,
+    SurveyTemplate,
+    SurveyTemplateStratum,
+    User,
+    UserProfile,
+)
+from .renditions import urls
 
 
 class UserProfileInline(admin.StackedInline):
@@ -37,7 +49,12 @@ class AnswerInline(admin.TabularInline):
     readonly_fields = ("get_image",)
 
     def get_image(self, obj):
-        return mark_safe(f'<img src={obj.image.url} width="100" height="110"')
+        images = urls(obj.image_renditions)
+        if images:
+            return mark_safe('<img src="{url}" width="{width}" height="{height}">'.format(**images[0]))
+        if obj.image:
+            return mark_safe(f'<img src="{obj.image.url}" width="100">')
+        return ""
 
     get_image.short_description = "Изображение"
 
@@ -45,12 +62,33 @@ class AnswerInline(admin.TabularInline):
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
     """Категории"""
-    list_display = ("question", "image")
+    list_display = ("question", "category", "image", "get_served", "get_answered", "get_right_answered")
+    list_filter = ("category",)
+    list_select_related = ("stats", "category")
     inlines = [AnswerInline]
     save_on_top = True
     save_as = True
     # list_display_links = ("name",)
 
+    def get_stats(self, obj):
+        try:
+            return obj.stats
+        except QuestionStats.DoesNotExist:
+            return QuestionStats(question=obj)
+
+    def get_served(self, obj):
+        return self.get_stats(obj).served
+
+    def get_answered(self, obj):
+        return self.get_stats(obj).answered
+
+    def get_right_answered(self, obj):
+        return self.get_stats(obj).right_answered
+
+    get_served.short_description = "Выдан в опросах"
+    get_answered.short_description = "Получен ответ"
+    get_right_answered.short_description = "Правильных ответов"
+
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
@@ -59,6 +97,23 @@ class AnswerAdmin(admin.ModelAdmin):
     # list_display_links = ("name",)
 
 
+@admin.register(QuestionCategory)
+class QuestionCategoryAdmin(admin.ModelAdmin):
+    list_display = ("name",)
+    search_fields = ("name",)
+
+
+class SurveyTemplateStratumInline(admin.TabularInline):
+    model = SurveyTemplateStratum
+    extra = 1
+
+
+@admin.register(SurveyTemplate)
+class SurveyTemplateAdmin(admin.ModelAdmin):
+    list_display = ("name", "question_count", "is_default")
+    inlines = [SurveyTemplateStratumInline]
+
+
 # admin.site.register(Question)
 # admin.site.register(Answer)
 admin.site.register(SimpleSurvey)
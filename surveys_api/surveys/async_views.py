@@ -0,0 +1,59 @@
+"""Асинхронный режим горячих путей опросов для запуска под ASGI.
+
+Включается переменной окружения SURVEYS_ASYNC_VIEWS=1. Синхронные DRF
+представления выполняются в пуле потоков (размер задает ASGI_THREADS),
+а цикл событий ASGI-сервера обслуживает медленных клиентов: чтение тела
+запроса и отправку ответа.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+
+def database_sync_to_async(func):
+    """sync_to_async для кода с ORM.
+
+    Вызов идет в общем пуле потоков (thread_sensitive=False), чтобы запросы
+    разных клиентов не выстраивались в очередь к одному потоку. У каждого
+    потока свое соединение с БД, устаревшие соединения закрываются до и
+    после вызова, как это делает обработчик запросов Django.
+    """
+
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False)
+
+
+def async_api_view(view):
+    """Оборачивает view из APIView.as_view() в корутину."""
+
+    def render_view(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        # Рендерим JSON в том же потоке, а не в главном потоке обработчика.
+        if hasattr(response, "render") and callable(response.render):
+            response = response.render()
+        return response
+
+    run_view = database_sync_to_async(render_view)
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run_view(request, *args, **kwargs)
+
+    return async_view
+
+
+def hot_path_view(view_class, **initkwargs):
+    """as_view() с асинхронной оберткой, если включен SURVEYS_ASYNC_VIEWS."""
+    view = view_class.as_view(**initkwargs)
+    if getattr(settings, "SURVEYS_ASYNC_VIEWS", False):
+        return async_api_view(view)
+    return view
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTTokenUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+USER_FLAGS_CACHE_KEY = "surveys:auth:user:{}"
+
+
+def get_cache():
+    return caches[getattr(settings, "SURVEYS_AUTH_USER_CACHE", "default")]
+
+
+def get_user_flags(user_id):
+    """(is_active, is_staff, is_superuser) пользователя с кэшированием на несколько секунд."""
+    timeout = getattr(settings, "SURVEYS_AUTH_USER_CACHE_TIMEOUT", 60)
+    cache = get_cache()
+    key = USER_FLAGS_CACHE_KEY.format(user_id)
+    flags = cache.get(key) if timeout else None
+    if flags is None:
+        flags = (
+            get_user_model()
+            .objects.filter(pk=user_id)
+            .values_list("is_active", "is_staff", "is_superuser")
+            .first()
+        )
+        if flags is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if timeout:
+            cache.set(key, flags, timeout)
+    return flags
+
+
+def delete_user_flags(user_id):
+    get_cache().delete(USER_FLAGS_CACHE_KEY.format(user_id))
+
+
+class SurveyTokenUser(TokenUser):
+    def __init__(self, token, is_staff=False, is_superuser=False):
+        super().__init__(token)
+        self.is_staff = is_staff
+        self.is_superuser = is_superuser
+
+
+class StatelessJWTAuthentication(JWTTokenUserAuthentication):
+    """JWT-аутентификация без загрузки пользователя из БД на каждый запрос.
+
+    request.user - легкий SurveyTokenUser с id из токена. Флаги is_active и
+    is_staff берутся из кэша, который заполняется одним запросом к БД раз в
+    SURVEYS_AUTH_USER_CACHE_TIMEOUT секунд. Представлениям, которым нужна
+    модель User целиком, следует указать JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        is_active, is_staff, is_superuser = get_user_flags(user.id)
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return SurveyTokenUser(validated_token, is_staff=is_staff, is_superuser=is_superuser)
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F
+
+CATALOGUE_VERSION_KEY = "surveys:catalogue:version"
+
+CatalogueAnswer = namedtuple("CatalogueAnswer", ("id", "answer", "image_renditions"))
+CatalogueQuestion = namedtuple(
+    "CatalogueQuestion", ("id", "question", "answers", "right_answer", "image_renditions")
+)
+
+
+class Catalogue:
+    """Неизменяемый снимок банка вопросов в памяти процесса.
+
+    Версия каталога хранится в строке CatalogueVersion основной БД и
+    увеличивается при любом изменении Question или Answer, поэтому у всех
+    процессов она одна и та же и входит в ETag опросов и ключи кэша
+    результатов. Прочитанная версия кэшируется в SURVEYS_CATALOGUE_CACHE на
+    SURVEYS_CATALOGUE_TIMEOUT секунд.
+
+    Снимок заполняется по мере обращения к вопросам и сбрасывается, когда
+    версия отличается от версии снимка, а также не реже раза в
+    SURVEYS_CATALOGUE_TIMEOUT секунд. С кэшем в памяти процесса
+    (LocMemCache) bump() сбрасывает версию лишь в своем воркере, остальные
+    видят правки с этой задержкой.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._loaded_at = 0.0
+        self._questions = MappingProxyType({})
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return getattr(settings, "SURVEYS_CATALOGUE_TIMEOUT", 60)
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "SURVEYS_CATALOGUE_CACHE", "default")]
+
+    def version(self):
+        cache = self.cache
+        version = cache.get(CATALOGUE_VERSION_KEY)
+        if version is None:
+            from .models import CatalogueVersion
+
+            # С основной БД: на реплике версия может отставать от уже закоммиченной правки.
+            versions = CatalogueVersion.objects.using(DEFAULT_DB_ALIAS).order_by("pk")
+            version = versions.values_list("version", flat=True).first() or 0
+            cache.set(CATALOGUE_VERSION_KEY, version, self.timeout)
+        return version
+
+    def bump(self):
+        from .models import CatalogueVersion
+
+        versions = CatalogueVersion.objects.using(DEFAULT_DB_ALIAS)
+        if not versions.update(version=F("version") + 1):
+            versions.get_or_create(pk=1)
+        self.cache.delete(CATALOGUE_VERSION_KEY)
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._loaded_at = 0.0
+            self._questions = MappingProxyType({})
+
+    def load(self, ids):
+        from .models import Answer, Question
+
+        answers = {}
+        for question_id, answer_id, answer, renditions in (
+            Answer.objects.filter(question_id__in=ids)
+            .order_by("id")
+            .values_list("question_id", "id", "answer", "image_renditions")
+        ):
+            answers.setdefault(question_id, []).append(CatalogueAnswer(answer_id, answer, renditions))
+        return {
+            question_id: CatalogueQuestion(
+                question_id, question, tuple(answers.get(question_id, ())), right_answer, renditions
+            )
+            for question_id, question, right_answer, renditions in (
+                Question.objects.filter(id__in=ids).values_list("id", "question", "right_answer", "image_renditions")
+            )
+        }
+
+    def get_many(self, ids):
+        """Возвращает вопросы с ответами в порядке ids, пропуская удаленные."""
+        version = self.version()
+        with self._lock:
+            if version != self._version or time.monotonic() - self._loaded_at > self.timeout:
+                self._version = version
+                self._loaded_at = time.monotonic()
+                self._questions = MappingProxyType({})
+            questions = self._questions
+        missing = [pk for pk in ids if pk not in questions]
+        if missing:
+            loaded = self.load(missing)
+            with self._lock:
+                if version == self._version:
+                    self._questions = MappingProxyType({**self._questions, **loaded})
+            questions = {**questions, **loaded}
+        return [questions[pk] for pk in ids if pk in questions]
+
+
+catalogue = Catalogue()
@@ -0,0 +1,119 @@
+"""Маршрутизация чтений на реплику БД.
+
+Чтения моделей приложения surveys внутри HTTP-запроса уходят на alias из
+настройки SURVEYS_DB_REPLICA. Запрос читает с основной БД, если он
+изменяющий (не GET/HEAD/OPTIONS), если в нем уже была запись, если открыта
+транзакция или если клиент недавно что-то записал. Недавнюю запись
+ReplicaPinMiddleware отмечает cookie и, для аутентифицированных клиентов,
+ключом в кэше SURVEYS_DB_PIN_CACHE по id пользователя: API-клиенты с JWT
+часто не хранят cookie. Вне HTTP-запросов все запросы идут в основную БД.
+"""
+import contextvars
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import LazyObject, empty
+
+PIN_COOKIE = "surveys_db_pin"
+USER_PIN_KEY = "surveys:db_pin:{}"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_state = contextvars.ContextVar("surveys_db_routing", default=None)
+
+
+def replica_alias():
+    return getattr(settings, "SURVEYS_DB_REPLICA", None)
+
+
+def get_pin_cache():
+    return caches[getattr(settings, "SURVEYS_DB_PIN_CACHE", "default")]
+
+
+def known_user_id(request):
+    """id аутентифицированного пользователя, если он уже известен.
+
+    Ленивый request.user из AuthenticationMiddleware не вычисляется: это
+    запрос к БД, который сам прошел бы через роутер.
+    """
+    user = getattr(request, "user", None)
+    if user is None or isinstance(user, LazyObject) and user._wrapped is empty:
+        return None
+    return user.id if user.is_authenticated else None
+
+
+def pin_user(request):
+    user_id = known_user_id(request)
+    if user_id is not None:
+        get_pin_cache().set(USER_PIN_KEY.format(user_id), True, getattr(settings, "SURVEYS_DB_PIN_SECONDS", 5))
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.pinned = request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+        self.wrote = False
+        self.user_checked = False
+
+    def is_pinned(self):
+        # Пользователь известен только после аутентификации DRF, поэтому проверяем его при чтении, один раз.
+        if not self.pinned and not self.user_checked:
+            user_id = known_user_id(self.request)
+            if user_id is not None:
+                self.user_checked = True
+                self.pinned = bool(get_pin_cache().get(USER_PIN_KEY.format(user_id)))
+        return self.pinned
+
+
+def start_request(request):
+    """Начинает маршрутизацию для запроса; возвращает токен для finish_request."""
+    return _state.set(RoutingState(request))
+
+
+def finish_request(token):
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        state = _state.get()
+        if not alias or state is None or model._meta.app_label != "surveys":
+            return None
+        if state.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block or state.is_pinned():
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # После записи дочитываем запрос с основной БД, чтобы видеть свои изменения.
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика получает схему через репликацию.
+        if db == replica_alias():
+            return False
+        return None
+
+
+def close_unusable_connections(**kwargs):
+    """Закрывает постоянные соединения, которые перестали отвечать.
+
+    Подключается к request_started при SURVEYS_DB_HEALTH_CHECKS, чтобы
+    запрос не получил ошибку на соединении, оборванном БД или пулером.
+    """
+    if not getattr(settings, "SURVEYS_DB_HEALTH_CHECKS", False):
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.in_atomic_block and not connection.is_usable():
+            connection.close()
@@ -0,0 +1,72 @@
+"""Сериализация опросов без дерева полей DRF.
+
+Строит те же словари, что SimpleSurveySerializer и SimpleSurveyResSerializer,
+из кортежей values_list и снимка каталога вопросов; JSON совпадает байт в
+байт. Включается для представления параметром fast_serialization.
+"""
+from rest_framework.fields import DateTimeField
+
+from . import renditions
+from .catalogue import catalogue
+from .metrics import timed_serialization
+from .models import SimpleSurveyResult
+
+SURVEY_FIELDS = ("id", "simple_survey_date", "status", "user_id")
+RESULT_FIELDS = ("id", "answered_id", "question_id")
+
+# Тот же формат даты, что у DateTimeField ModelSerializer (DATETIME_FORMAT, часовой пояс).
+_date_field = DateTimeField()
+
+
+def question_data(question, with_right_answer):
+    data = {
+        "id": question.id,
+        "question": question.question,
+        "images": renditions.urls(question.image_renditions),
+        "answers": [
+            {"id": answer.id, "answer": answer.answer, "images": renditions.urls(answer.image_renditions)}
+            for answer in question.answers
+        ],
+    }
+    if with_right_answer:
+        data["right_answer"] = question.right_answer
+    return data
+
+
+@timed_serialization
+def survey_data(survey, results, with_right_answer=False):
+    """Словарь опроса из (id, дата, статус) и [(id, answered_id, question_id)] результатов.
+
+    with_right_answer=False - формат SimpleSurveySerializer, True - SimpleSurveyResSerializer.
+    """
+    pk, date, status = survey[:3]
+    questions = catalogue.get_many([question_id for _, _, question_id in results])
+    return {
+        "id": pk,
+        "simple_survey_date": _date_field.to_representation(date),
+        "status": status,
+        "questions": [question_data(question, with_right_answer) for question in questions],
+        "simple_survey_result" if with_right_answer else "simple_surveys_result": [
+            {"id": result_id, "answered_id": answered_id, "question": question_id}
+            for result_id, answered_id, question_id in results
+        ],
+    }
+
+
+def instance_data(survey, with_right_answer=False):
+    """survey_data для загруженного опроса с SURVEY_PREFETCH."""
+    results = [
+        (result.id, result.answered_id, result.question_id) for result in survey.simple_survey_result_set.all()
+    ]
+    return survey_data((survey.id, survey.simple_survey_date, survey.status), results, with_right_answer)
+
+
+def load(queryset):
+    """Первый опрос queryset и его результаты двумя запросами; None, если опроса нет."""
+    survey = queryset.values_list(*SURVEY_FIELDS).first()
+    if survey is None:
+        return None
+    results = list(
+        SimpleSurveyResult.objects.filter(simple_survey_id=survey[0]).order_by("id").values_list(*RESULT_FIELDS)
+    )
+    return survey, results
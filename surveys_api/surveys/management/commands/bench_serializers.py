@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from surveys import fast_serializers
+from surveys.catalogue import catalogue
+from surveys.models import Answer, Question, SimpleSurvey, SurveyTemplate
+from surveys.question_pool import question_pool
+from surveys.serializers import SimpleSurveyResSerializer, SimpleSurveySerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время DRF-сериализаторов и surveys.fast_serializers на опросе из --questions вопросов "
+        "и проверяет, что JSON совпадает. Данные создаются во временной транзакции и откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--questions", type=int, default=100)
+        parser.add_argument("--answers", type=int, default=4, help="Ответов на вопрос")
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.bench(options["questions"], options["answers"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            question_pool.invalidate()
+            catalogue.clear()
+
+    def bench(self, question_count, answer_count, repeat):
+        questions = [Question(question="Вопрос {}".format(i)) for i in range(question_count)]
+        for question in questions:
+            question.save()
+        Answer.objects.bulk_create(
+            Answer(question=question, answer="Ответ {}".format(j))
+            for question in questions
+            for j in range(answer_count)
+        )
+        Question.objects.filter(pk__in=[question.pk for question in questions]).update(answer_count=answer_count)
+        template = SurveyTemplate.objects.create(name="bench", question_count=question_count)
+        question_pool.invalidate()
+        survey = SimpleSurvey.objects.create(template=template, status=True)
+        survey = SimpleSurvey.objects.with_questions().get(pk=survey.pk)
+        if survey.simple_survey_result_set.count() < question_count:
+            raise CommandError("В банке меньше {} вопросов с ответами".format(question_count))
+        loaded = fast_serializers.load(SimpleSurvey.objects.filter(pk=survey.pk))
+        renderer = JSONRenderer()
+
+        cases = (
+            ("SimpleSurveySerializer", lambda: SimpleSurveySerializer(survey).data),
+            ("fast survey_data", lambda: fast_serializers.survey_data(*loaded)),
+            ("SimpleSurveyResSerializer", lambda: SimpleSurveyResSerializer(survey).data),
+            ("fast survey_data (res)", lambda: fast_serializers.survey_data(*loaded, with_right_answer=True)),
+        )
+        rendered = {}
+        for name, serialize in cases:
+            rendered[name] = renderer.render(serialize())
+            started = time.perf_counter()
+            for _ in range(repeat):
+                renderer.render(serialize())
+            elapsed = (time.perf_counter() - started) / repeat
+            self.stdout.write("{:28} {:8.3f} мс".format(name, elapsed * 1000))
+        identical = (
+            rendered["SimpleSurveySerializer"] == rendered["fast survey_data"]
+            and rendered["SimpleSurveyResSerializer"] == rendered["fast survey_data (res)"]
+        )
+        self.stdout.write("JSON совпадает: {}".format("да" if identical else "НЕТ"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from surveys.models import Answer, Question
+from surveys.renditions import build, get_executor
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит уменьшенные копии изображений вопросов и ответов, у которых их еще нет "
+        "(например, после import_questions, который не отправляет сигналы)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Перестроить копии для всех изображений")
+
+    def handle(self, *args, **options):
+        executor = get_executor()
+        futures = []
+        for model in (Question, Answer):
+            for pk, name, renditions in model.objects.exclude(image="").values_list("id", "image", "image_renditions"):
+                if options["force"] or renditions.get("source") != name:
+                    futures.append(executor.submit(build, model, pk, name))
+        built = sum(future.result() for future in futures)
+        self.stdout.write("Построены копии для {} изображений".format(built))
@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from surveys.models import Answer, Question, SimpleSurvey, SimpleSurveyResult
+
+
+class Command(BaseCommand):
+    help = (
+        "Печатает планы и время основных запросов к SimpleSurvey и SimpleSurveyResult. "
+        "Запустите до и после миграции индексов, чтобы сравнить результаты."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed-results", type=int, default=0, help="Сначала добавить столько строк результатов")
+        parser.add_argument("--results-per-survey", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=100, help="Сколько раз выполнять каждый запрос")
+
+    def handle(self, *args, **options):
+        if options["seed_results"]:
+            self.seed(options["seed_results"], options["results_per_survey"], options["batch_size"])
+
+        survey_ids = list(SimpleSurvey.objects.order_by("?").values_list("id", flat=True)[: options["repeat"]])
+        if not survey_ids:
+            self.stderr.write("Нет опросов, используйте --seed-results")
+            return
+        result_ids = {
+            survey_id: list(
+                SimpleSurveyResult.objects.filter(simple_survey_id=survey_id).values_list("id", flat=True)
+            )
+            for survey_id in survey_ids
+        }
+
+        self.stdout.write("{}, строк результатов: {}".format(connection.vendor, SimpleSurveyResult.objects.count()))
+        queries = (
+            (
+                "results by survey",
+                lambda pk: SimpleSurveyResult.objects.filter(simple_survey_id=pk),
+            ),
+            (
+                "results by (survey, id)",
+                lambda pk: SimpleSurveyResult.objects.filter(simple_survey_id=pk, id__in=result_ids[pk]),
+            ),
+            (
+                "open surveys by date",
+                lambda pk: SimpleSurvey.objects.filter(status=False).order_by("-simple_survey_date")[:50],
+            ),
+        )
+        for name, make_queryset in queries:
+            self.stdout.write("\n== {}".format(name))
+            self.stdout.write(make_queryset(survey_ids[0]).explain())
+            started = time.perf_counter()
+            for pk in survey_ids:
+                list(make_queryset(pk))
+            elapsed = (time.perf_counter() - started) / len(survey_ids)
+            self.stdout.write("среднее время: {:.3f} мс".format(elapsed * 1000))
+
+    def seed(self, total, per_survey, batch_size):
+        question_ids = list(Question.objects.values_list("id", flat=True)[: per_survey * 10])
+        if len(question_ids) < per_survey:
+            with transaction.atomic():
+                questions = Question.objects.bulk_create(
+                    Question(question="Вопрос {}".format(i), answer_count=1) for i in range(per_survey * 10)
+                )
+                if not connection.features.can_return_rows_from_bulk_insert:
+                    questions = Question.objects.order_by("-id")[: per_survey * 10]
+                Answer.objects.bulk_create(Answer(question=question, answer="Ответ") for question in questions)
+            question_ids = list(Question.objects.values_list("id", flat=True)[: per_survey * 10])
+
+        created = 0
+        while created < total:
+            surveys_count = max(1, min(batch_size, total - created) // per_survey)
+            with transaction.atomic():
+                SimpleSurvey.objects.bulk_create(
+                    SimpleSurvey(status=random.random() < 0.9) for _ in range(surveys_count)
+                )
+                surveys = SimpleSurvey.objects.order_by("-id").values_list("id", flat=True)[:surveys_count]
+                SimpleSurveyResult.objects.bulk_create(
+                    SimpleSurveyResult(simple_survey_id=survey_id, question_id=question_id)
+                    for survey_id in surveys
+                    for question_id in random.sample(question_ids, per_survey)
+                )
+            created += surveys_count * per_survey
+            self.stdout.write("добавлено {} строк результатов".format(created))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from surveys.question_bank import FORMATS, export_records, guess_format, write_records
+
+
+class OutputStream:
+    """Файловый интерфейс над self.stdout команды, чтобы вывод перехватывался call_command(..., stdout=...)."""
+
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, text):
+        self.output.write(text, ending="")
+
+
+class Command(BaseCommand):
+    help = "Выгружает банк вопросов с ответами в JSON Lines или CSV, не загружая его в память целиком."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Файл для выгрузки или - для stdout")
+        parser.add_argument("--format", choices=FORMATS, help="По умолчанию определяется по расширению файла")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or guess_format(path)
+        if path == "-":
+            write_records(export_records(batch_size=options["batch_size"]), OutputStream(self.stdout), fmt)
+            return
+        with open(path, "w", encoding="utf-8", newline="") as stream:
+            write_records(export_records(batch_size=options["batch_size"]), stream, fmt)
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.result_export import FORMATS, parse_since, result_lines
+
+
+class Command(BaseCommand):
+    help = "Выгружает результаты опросов в CSV или NDJSON потоком, с отметкой since для инкрементальных выгрузок."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Файл для выгрузки или - для stdout")
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--since", help="Только опросы с simple_survey_date не раньше этой отметки (ISO 8601)")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_since(options["since"])
+        except ValueError as e:
+            raise CommandError(e)
+        path = options["path"]
+        lines = result_lines(options["format"], since=since, chunk_size=options["chunk_size"])
+        if path == "-":
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        with open(path, "w", encoding="utf-8", newline="") as stream:
+            stream.writelines(lines)
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from surveys.models import SimpleSurvey
+from surveys.question_pool import question_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Пополняет резерв заранее собранных опросов до --size. С --interval работает как фоновый "
+        "процесс и проверяет резерв каждые interval секунд. Резерв используется при SURVEYS_PREBUILT_POOL=1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=1000, help="Сколько опросов держать в резерве")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--interval", type=float, default=0, help="Пауза между проверками, секунд")
+
+    def handle(self, *args, **options):
+        while True:
+            self.fill(options["size"], options["batch_size"])
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def fill(self, size, batch_size):
+        # claim() берет из резерва только опросы шаблона по умолчанию; после смены шаблона
+        # старые опросы резерва никому не достанутся, поэтому удаляем их и собираем заново.
+        question_pool.invalidate()
+        template_id = question_pool.default_template()
+        pooled = SimpleSurvey.objects.filter(pooled=True)
+        _, deleted = pooled.exclude(template_id=template_id).delete()
+        stale = deleted.get(SimpleSurvey._meta.label, 0)
+        if stale:
+            self.stdout.write("Из резерва удалено опросов других шаблонов: {}".format(stale))
+        missing = size - pooled.filter(template_id=template_id).count()
+        created = 0
+        while created < missing:
+            created += len(SimpleSurvey.objects.prebuild(min(batch_size, missing - created), template_id))
+        if created:
+            self.stdout.write("В резерв добавлено опросов: {}".format(created))
@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.question_bank import FORMATS, guess_format, import_records, read_records
+
+
+class Command(BaseCommand):
+    help = "Импортирует вопросы с ответами из JSON Lines или CSV пачками в отдельных транзакциях."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл для импорта или - для stdin")
+        parser.add_argument("--format", choices=FORMATS, help="По умолчанию определяется по расширению файла")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or guess_format(path)
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8", newline="")
+        try:
+            total = import_records(read_records(stream, fmt), batch_size=options["batch_size"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise CommandError(e)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS("Импортировано вопросов: {}".format(total)))
@@ -0,0 +1,83 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест горячих путей опросов на запущенном сервере: создание, получение и "
+        "сохранение опроса. Запустите против WSGI (gunicorn) и ASGI (uvicorn) развертываний "
+        "и сравните результаты."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="Адрес сервера, например http://127.0.0.1:8000")
+        parser.add_argument("--email", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--concurrency", type=int, default=50, help="Число одновременных клиентов")
+        parser.add_argument("--sessions", type=int, default=500, help="Сколько опросов пройти всего")
+        parser.add_argument(
+            "--client-delay", type=float, default=0.0, help="Пауза клиента между запросами, секунд"
+        )
+
+    def handle(self, *args, **options):
+        api = options["url"].rstrip("/") + "/api"
+        response = requests.post(
+            api + "/auth/", json={"email": options["email"], "password": options["password"]}
+        )
+        if response.status_code != 200:
+            raise CommandError("Не удалось получить токен: {}".format(response.text))
+        headers = {"Authorization": "JWT {}".format(response.json()["access"])}
+        timings = {"create": [], "get": [], "put": [], "results": []}
+        errors = []
+
+        def timed(name, method, url, **kwargs):
+            started = time.perf_counter()
+            response = method(url, headers=headers, timeout=60, **kwargs)
+            timings[name].append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors.append("{} {}".format(name, response.status_code))
+            time.sleep(options["client_delay"])
+            return response
+
+        def session(_):
+            with requests.Session() as http:
+                survey = timed("create", http.post, api + "/surveys/create/").json()
+                timed("get", http.get, "{}/surveys/{}/".format(api, survey["id"]))
+                answers = [
+                    {"id": result["id"], "answered_id": 0} for result in survey["simple_surveys_result"]
+                ]
+                timed(
+                    "put",
+                    http.put,
+                    "{}/surveys/{}/".format(api, survey["id"]),
+                    json={"simple_survey_result": answers},
+                )
+                timed("results", http.get, "{}/results/{}/".format(api, survey["id"]))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            list(executor.map(session, range(options["sessions"])))
+        elapsed = time.perf_counter() - started
+
+        total = sum(len(values) for values in timings.values())
+        self.stdout.write(
+            "{} запросов за {:.1f} с, {:.1f} запросов/с, ошибок: {}".format(
+                total, elapsed, total / elapsed, len(errors)
+            )
+        )
+        for name, values in timings.items():
+            if not values:
+                continue
+            values.sort()
+            self.stdout.write(
+                "{:8} p50 {:7.1f} мс  p95 {:7.1f} мс  p99 {:7.1f} мс".format(
+                    name,
+                    statistics.median(values) * 1000,
+                    values[int(len(values) * 0.95) - 1] * 1000,
+                    values[int(len(values) * 0.99) - 1] * 1000,
+                )
+            )
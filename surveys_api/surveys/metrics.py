@@ -0,0 +1,171 @@
+"""Метрики запросов: время ответа, число и время SQL-запросов, время сериализации и рендеринга.
+
+Счетчики текущего запроса хранятся в contextvar и поэтому видны и из потоков
+sync_to_async, в которых async views выполняют запросы к БД. Гистограммы
+накапливаются в памяти процесса и отдаются в текстовом формате Prometheus.
+
+Сериализация - построение данных ответа (serializer.data или
+fast_serializers), включая запросы, которые она делает; рендеринг -
+кодирование этих данных в JSON.
+"""
+import contextvars
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+_current = contextvars.ContextVar("surveys_request_metrics", default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.render_time = 0.0
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total_time):
+        return 'db;dur={:.1f};desc="{} queries", serialize;dur={:.1f}, render;dur={:.1f}, total;dur={:.1f}'.format(
+            self.db_time * 1000, self.queries, self.serialize_time * 1000, self.render_time * 1000, total_time * 1000
+        )
+
+
+def start_request():
+    return _current.set(RequestMetrics())
+
+
+def finish_request(token):
+    metrics = _current.get()
+    _current.reset(token)
+    return metrics
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper, который считает запросы и их время в метриках текущего запроса."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Обработчик connection_created: подключает record_query к соединению."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_serialization(func):
+    """Учитывает время вызова func как время сериализации текущего запроса."""
+
+    @functools.wraps(func)
+    def inner(*args, **kwargs):
+        metrics = _current.get()
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if metrics is not None:
+                metrics.serialize_time += time.perf_counter() - started
+
+    return inner
+
+
+class TimedSerializerMixin:
+    """Учитывает обращение к serializer.data как время сериализации.
+
+    Вложенные сериализаторы строятся через to_representation, поэтому время
+    считается один раз - на внешнем сериализаторе.
+    """
+
+    @property
+    @timed_serialization
+    def data(self):
+        return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, ListSerializer):
+    """list_serializer_class для many=True у сериализаторов с TimedSerializerMixin."""
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer, который учитывает время рендеринга в метриках запроса."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        metrics = _current.get()
+        started = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            if metrics is not None:
+                metrics.render_time += time.perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            counts, total = self.series.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self.series[labels] = (counts, total + value)
+
+    def clear(self):
+        with self._lock:
+            self.series = {}
+
+    def exposition(self):
+        lines = ["# HELP {} {}".format(self.name, self.help_text), "# TYPE {} histogram".format(self.name)]
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self.series.items())
+        for labels, counts, total in series:
+            label_text = ",".join('{}="{}"'.format(key, value) for key, value in labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(self.name, label_text, bound, cumulative))
+            lines.append("{}_sum{{{}}} {}".format(self.name, label_text, total))
+            lines.append("{}_count{{{}}} {}".format(self.name, label_text, cumulative))
+        return "\n".join(lines)
+
+
+HISTOGRAMS = {
+    "duration": Histogram("surveys_request_duration_seconds", "Время ответа", DURATION_BUCKETS),
+    "db": Histogram("surveys_request_db_seconds", "Время SQL-запросов", DURATION_BUCKETS),
+    "serialize": Histogram("surveys_request_serialize_seconds", "Время сериализации ответа", DURATION_BUCKETS),
+    "render": Histogram("surveys_request_render_seconds", "Время рендеринга ответа в JSON", DURATION_BUCKETS),
+    "queries": Histogram("surveys_request_queries", "Число SQL-запросов", QUERY_BUCKETS),
+}
+
+
+def observe(view, method, metrics, total_time):
+    labels = (("method", method), ("view", view))
+    HISTOGRAMS["duration"].observe(labels, total_time)
+    HISTOGRAMS["db"].observe(labels, metrics.db_time)
+    HISTOGRAMS["serialize"].observe(labels, metrics.serialize_time)
+    HISTOGRAMS["render"].observe(labels, metrics.render_time)
+    HISTOGRAMS["queries"].observe(labels, metrics.queries)
+
+
+def exposition():
+    return "\n".join(histogram.exposition() for histogram in HISTOGRAMS.values()) + "\n"
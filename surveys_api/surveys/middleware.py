@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import db_routers, metrics
+from .storage import is_hashed_name
+
+logger = logging.getLogger("surveys.metrics")
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, который под ASGI не переводит цепочку middleware в синхронный режим.
+
+    Кроме STATIC_ROOT раздает загрузки из MEDIA_ROOT (если SURVEYS_SERVE_MEDIA):
+    с ETag, Range и Cache-Control: immutable для файлов с именем из хэша
+    содержимого (см. HashedMediaStorage).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.media_prefix = settings.MEDIA_URL if getattr(settings, "SURVEYS_SERVE_MEDIA", True) else ""
+        self.media_root = settings.MEDIA_ROOT
+        self.media_files = {}
+        if asyncio.iscoroutinefunction(get_response):
+            # Так Django определяет асинхронный middleware, см. MiddlewareMixin.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+    def process_request(self, request):
+        response = super().process_request(request)
+        if response is None and self.media_prefix and request.path_info.startswith(self.media_prefix):
+            static_file = self.find_media_file(request.path_info)
+            if static_file is not None:
+                response = self.serve(static_file, request)
+        return response
+
+    def find_media_file(self, url):
+        static_file = self.media_files.get(url)
+        if static_file is None:
+            try:
+                path = safe_join(self.media_root, url[len(self.media_prefix):])
+            except SuspiciousFileOperation:
+                return None
+            if not os.path.isfile(path):
+                return None
+            static_file = self.get_static_file(path, url)
+            if is_hashed_name(path):
+                # Файл с хэшем в имени не меняется, заголовки можно запомнить.
+                self.media_files[url] = static_file
+        return static_file
+
+    def immutable_file_test(self, path, url):
+        if self.media_prefix and url.startswith(self.media_prefix):
+            return is_hashed_name(url)
+        return super().immutable_file_test(path, url)
+
+
+class ReplicaPinMiddleware:
+    """Включает маршрутизацию чтений на реплику и закрепляет клиента за основной БД после записи.
+
+    Если в запросе была запись, ответ ставит cookie на SURVEYS_DB_PIN_SECONDS
+    секунд, а для аутентифицированного пользователя - ключ в кэше на тот же
+    срок, и следующие чтения этого клиента идут в основную БД, пока реплика
+    догоняет ее.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = db_routers.start_request(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            state = db_routers.finish_request(token)
+        return self.pin(state, response)
+
+    async def __acall__(self, request):
+        token = db_routers.start_request(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            state = db_routers.finish_request(token)
+        return self.pin(state, response)
+
+    def pin(self, state, response):
+        if state.wrote and db_routers.replica_alias():
+            response.set_cookie(
+                db_routers.PIN_COOKIE, "1", max_age=getattr(settings, "SURVEYS_DB_PIN_SECONDS", 5), httponly=True
+            )
+            db_routers.pin_user(state.request)
+        return response
+
+
+class PerformanceMiddleware:
+    """Замеряет время ответа, число и время SQL-запросов, время сериализации и рендеринга.
+
+    Результат уходит в заголовок Server-Timing, в лог surveys.metrics одной
+    JSON-строкой и в гистограммы для /api/metrics/. Если запросов к БД больше
+    SURVEYS_METRICS_QUERY_WARNING, строка лога пишется с уровнем WARNING.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = metrics.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics = metrics.finish_request(token)
+        return self.report(request, response, request_metrics)
+
+    async def __acall__(self, request):
+        token = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics = metrics.finish_request(token)
+        return self.report(request, response, request_metrics)
+
+    def report(self, request, response, request_metrics):
+        total_time = request_metrics.total_time
+        view = request.resolver_match.view_name if request.resolver_match else "unmatched"
+        metrics.observe(view, request.method, request_metrics, total_time)
+        response["Server-Timing"] = request_metrics.server_timing(total_time)
+        threshold = getattr(settings, "SURVEYS_METRICS_QUERY_WARNING", 20)
+        logger.log(
+            logging.WARNING if request_metrics.queries > threshold else logging.INFO,
+            json.dumps(
+                {
+                    "view": view,
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "total_ms": round(total_time * 1000, 1),
+                    "db_ms": round(request_metrics.db_time * 1000, 1),
+                    "queries": request_metrics.queries,
+                    "serialize_ms": round(request_metrics.serialize_time * 1000, 1),
+                    "render_ms": round(request_metrics.render_time * 1000, 1),
+                }
+            ),
+        )
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:12
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_answer_count(apps, schema_editor):
+    Question = apps.get_model('surveys', 'Question')
+    Answer = apps.get_model('surveys', 'Answer')
+    answers = Answer.objects.filter(question=OuterRef('pk')).order_by().values('question').annotate(count=Count('id'))
+    Question.objects.update(answer_count=Coalesce(Subquery(answers.values('count')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0002_auto_20230112_0546'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество ответов'),
+        ),
+        migrations.RunPython(fill_answer_count, migrations.RunPython.noop),
+    ]
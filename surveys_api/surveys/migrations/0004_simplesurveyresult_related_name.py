@@ -0,0 +1,19 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0003_question_answer_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='simplesurveyresult',
+            name='simple_survey',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simple_survey_result_set', to='surveys.simplesurvey'),
+        ),
+    ]
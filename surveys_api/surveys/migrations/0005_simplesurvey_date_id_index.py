@@ -0,0 +1,17 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0004_simplesurveyresult_related_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simplesurvey',
+            index=models.Index(fields=['simple_survey_date', 'id'], name='survey_date_id_idx'),
+        ),
+    ]
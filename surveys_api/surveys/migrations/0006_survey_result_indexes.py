@@ -0,0 +1,46 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Min
+
+
+def delete_duplicate_results(apps, schema_editor):
+    SimpleSurveyResult = apps.get_model('surveys', 'SimpleSurveyResult')
+    duplicates = (
+        SimpleSurveyResult.objects.values('simple_survey', 'question')
+        .annotate(count=Count('id'), first_id=Min('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        SimpleSurveyResult.objects.filter(
+            simple_survey=duplicate['simple_survey'], question=duplicate['question']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0005_simplesurvey_date_id_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_results, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='simplesurvey',
+            index=models.Index(condition=models.Q(status=False), fields=['simple_survey_date'], name='survey_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simplesurveyresult',
+            index=models.Index(fields=['simple_survey', 'id'], name='result_survey_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='simplesurveyresult',
+            constraint=models.UniqueConstraint(fields=('simple_survey', 'question'), name='result_survey_question_unique'),
+        ),
+        migrations.AlterField(
+            model_name='simplesurveyresult',
+            name='simple_survey',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='simple_survey_result_set', to='surveys.simplesurvey'),
+        ),
+    ]
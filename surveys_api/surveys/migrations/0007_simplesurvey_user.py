@@ -0,0 +1,24 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0006_survey_result_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simplesurvey',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='simple_surveys', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddIndex(
+            model_name='simplesurvey',
+            index=models.Index(fields=['user', 'status', 'simple_survey_date'], name='survey_user_status_date_idx'),
+        ),
+    ]
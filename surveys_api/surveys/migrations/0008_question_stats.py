@@ -0,0 +1,56 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:19
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+import django.db.models.deletion
+
+
+def fill_question_stats(apps, schema_editor):
+    QuestionStats = apps.get_model('surveys', 'QuestionStats')
+    SimpleSurveyResult = apps.get_model('surveys', 'SimpleSurveyResult')
+    stats = (
+        SimpleSurveyResult.objects.filter(simple_survey__status=True)
+        .order_by()
+        .values('question')
+        .annotate(
+            served=Count('id'),
+            answered=Count('id', filter=Q(answered=True)),
+            right_answered=Count('id', filter=Q(right_answered=True)),
+        )
+    )
+    QuestionStats.objects.bulk_create(
+        (
+            QuestionStats(
+                question_id=item['question'],
+                served=item['served'],
+                answered=item['answered'],
+                right_answered=item['right_answered'],
+            )
+            for item in stats.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0007_simplesurvey_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='surveys.question', verbose_name='Вопрос')),
+                ('served', models.PositiveIntegerField(default=0, verbose_name='Выдан в опросах')),
+                ('answered', models.PositiveIntegerField(default=0, verbose_name='Получен ответ')),
+                ('right_answered', models.PositiveIntegerField(default=0, verbose_name='Правильных ответов')),
+            ],
+            options={
+                'verbose_name': 'Статистика вопроса',
+                'verbose_name_plural': 'Статистика вопросов',
+            },
+        ),
+        migrations.RunPython(fill_question_stats, migrations.RunPython.noop),
+    ]
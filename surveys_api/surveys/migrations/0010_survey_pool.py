@@ -0,0 +1,22 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0009_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simplesurvey',
+            name='pooled',
+            field=models.BooleanField(default=False, editable=False, verbose_name='В резерве'),
+        ),
+        migrations.AddIndex(
+            model_name='simplesurvey',
+            index=models.Index(condition=models.Q(pooled=True), fields=['id'], name='survey_pooled_idx'),
+        ),
+    ]
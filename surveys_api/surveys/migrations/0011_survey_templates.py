@@ -0,0 +1,81 @@
+# Generated by Django 3.1.3 on 2026-10-18 07:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0010_survey_pool'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionCategory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Название')),
+            ],
+            options={
+                'verbose_name': 'Категория вопросов',
+                'verbose_name_plural': 'Категории вопросов',
+            },
+        ),
+        migrations.CreateModel(
+            name='SurveyTemplate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('question_count', models.PositiveIntegerField(default=3, help_text='Используется, если у шаблона нет страт', verbose_name='Количество вопросов')),
+                ('is_default', models.BooleanField(default=False, verbose_name='По умолчанию')),
+            ],
+            options={
+                'verbose_name': 'Шаблон опроса',
+                'verbose_name_plural': 'Шаблоны опросов',
+            },
+        ),
+        migrations.CreateModel(
+            name='SurveyTemplateStratum',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_count', models.PositiveIntegerField(default=1, verbose_name='Количество вопросов')),
+            ],
+            options={
+                'verbose_name': 'Страта шаблона',
+                'verbose_name_plural': 'Страты шаблона',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='simplesurvey',
+            name='survey_pooled_idx',
+        ),
+        migrations.AddField(
+            model_name='surveytemplatestratum',
+            name='category',
+            field=models.ForeignKey(blank=True, help_text='Пусто - вопросы из любых категорий', null=True, on_delete=django.db.models.deletion.CASCADE, to='surveys.questioncategory', verbose_name='Категория'),
+        ),
+        migrations.AddField(
+            model_name='surveytemplatestratum',
+            name='template',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='strata', to='surveys.surveytemplate', verbose_name='Шаблон'),
+        ),
+        migrations.AddConstraint(
+            model_name='surveytemplate',
+            constraint=models.UniqueConstraint(condition=models.Q(is_default=True), fields=('is_default',), name='template_single_default'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='questions', to='surveys.questioncategory', verbose_name='Категория'),
+        ),
+        migrations.AddField(
+            model_name='simplesurvey',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='surveys.surveytemplate', verbose_name='Шаблон'),
+        ),
+        migrations.AddIndex(
+            model_name='simplesurvey',
+            index=models.Index(condition=models.Q(pooled=True), fields=['template', 'id'], name='survey_pooled_idx'),
+        ),
+    ]
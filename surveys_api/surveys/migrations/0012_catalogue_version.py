@@ -0,0 +1,30 @@
+# Generated by Django 3.1.3 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    CatalogueVersion = apps.get_model('surveys', 'CatalogueVersion')
+    CatalogueVersion.objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0011_survey_templates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogueVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия каталога вопросов',
+                'verbose_name_plural': 'Версии каталога вопросов',
+            },
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,16 @@
 import math
-from random import randint, random, shuffle
+from random import randint, random
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import Count, Max
+from django.db import connections, models, transaction
+from django.db.models import Case, Count, F, Max, Prefetch, Q, When
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from .catalogue import catalogue
+from .question_pool import question_pool
+
 
 class User(AbstractUser):
     username = models.CharField(max_length=150, blank=True, null=True)
@@ -29,18 +33,46 @@ class UserProfile(models.Model):
     photo = models.ImageField(upload_to="uploads", blank=True)
 
 
-QUESTION_PER_SURVEY = 3
+class QuestionCategory(models.Model):
+    name = models.CharField("Название", max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = "Категория вопросов"
+        verbose_name_plural = "Категории вопросов"
+
+    def __str__(self):
+        return self.name
 
 
 class Question(models.Model):
     question = models.CharField("Вопрос", max_length=200)
+    category = models.ForeignKey(
+        QuestionCategory,
+        verbose_name="Категория",
+        on_delete=models.SET_NULL,
+        related_name="questions",
+        null=True,
+        blank=True,
+    )
     image = models.ImageField("Изображение", upload_to="question/", blank=True)
     right_answer = models.IntegerField("ID правильного ответа", default=0)
+    answer_count = models.PositiveIntegerField("Количество ответов", default=0, db_index=True, editable=False)
+    image_renditions = models.JSONField("Копии изображения", default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Вопрос"
         verbose_name_plural = "Вопросы"
 
+    def save(self, *args, **kwargs):
+        # answer_count ведется сигналами Answer, не перезаписываем его значением из памяти.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "answer_count"
+            ]
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.question
 
@@ -68,57 +100,211 @@ def get_random_item(model, max_id=None):
 #     return randomlist
 
 
-def random_list(model, count):
-    count_objects = model.objects.aggregate(count=Count("id"))["count"]
-    object_list = []
-    if count >= count_objects:
-        object_list = list(model.objects.all())
-        shuffle(object_list)
-    else:
-        while len(object_list) < count:
-            random_index = randint(0, count_objects - 1)
-            random_item = model.objects.all()[random_index]
-            if random_item in object_list:
-                continue
-            else:
-                object_list.append(random_item)
-    return object_list
-
-
 class Answer(models.Model):
     answer = models.CharField("Ответ", max_length=200)
     image = models.ImageField("Изображение", upload_to="answer/", blank=True)
+    image_renditions = models.JSONField("Копии изображения", default=dict, blank=True, editable=False)
     question = models.ForeignKey(Question, verbose_name="Вопрос", on_delete=models.CASCADE, related_name="answers")
 
     class Meta:
         verbose_name = "Ответ"
         verbose_name_plural = "Ответы"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Вопрос из БД: при переносе ответа сигнал поправит answer_count обоих вопросов.
+        instance._loaded_question_id = instance.__dict__.get("question_id")
+        return instance
+
     def __str__(self):
         return "#id {}".format(self.id)
 
 
+class SurveyTemplate(models.Model):
+    """Шаблон опроса: число вопросов или набор страт по категориям."""
+
+    name = models.CharField("Название", max_length=100)
+    question_count = models.PositiveIntegerField(
+        "Количество вопросов", default=3, help_text="Используется, если у шаблона нет страт"
+    )
+    is_default = models.BooleanField("По умолчанию", default=False)
+
+    class Meta:
+        verbose_name = "Шаблон опроса"
+        verbose_name_plural = "Шаблоны опросов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["is_default"], condition=Q(is_default=True), name="template_single_default"
+            )
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class SurveyTemplateStratum(models.Model):
+    template = models.ForeignKey(
+        SurveyTemplate, verbose_name="Шаблон", on_delete=models.CASCADE, related_name="strata"
+    )
+    category = models.ForeignKey(
+        QuestionCategory,
+        verbose_name="Категория",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Пусто - вопросы из любых категорий",
+    )
+    question_count = models.PositiveIntegerField("Количество вопросов", default=1)
+
+    class Meta:
+        verbose_name = "Страта шаблона"
+        verbose_name_plural = "Страты шаблона"
+
+    def __str__(self):
+        return "{}: {}".format(self.category or "любые", self.question_count)
+
+
+class SimpleSurveyQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Опросы пользователя; сотрудникам доступны все опросы, кроме резерва."""
+        if user.is_staff:
+            return self.filter(pooled=False)
+        return self.filter(user_id=user.id)
+
+    def prebuild(self, count, template_id=None):
+        """Создает count опросов в резерве с уже выбранными вопросами."""
+        template_id = template_id or question_pool.default_template()
+        strata = question_pool.strata(template_id)
+        surveys = [self.model(pooled=True, template_id=template_id) for _ in range(count)]
+        with transaction.atomic(using=self.db):
+            if not connections[self.db].features.can_return_rows_from_bulk_insert:
+                for survey in surveys:
+                    survey.save(using=self.db)
+                return surveys
+            samples = question_pool.sample_existing_ids(strata, count=count, using=self.db)
+            self.bulk_create(surveys)
+            SimpleSurveyResult.objects.using(self.db).bulk_create(
+                SimpleSurveyResult(simple_survey=survey, question_id=question_id)
+                for survey, question_ids in zip(surveys, samples)
+                for question_id in question_ids
+            )
+        return surveys
+
+    def claim(self, user_id, template_id=None, attempts=3):
+        """Отдает пользователю опрос из резерва; None, если резерв пуст.
+
+        Строка резерва блокируется SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+        параллельные запросы забирают разные опросы, не дожидаясь друг друга.
+        """
+        for attempt in range(attempts):
+            with transaction.atomic(using=self.db):
+                survey = (
+                    self.select_for_update(skip_locked=True)
+                    .filter(pooled=True, template_id=template_id or question_pool.default_template())
+                    .order_by("id")
+                    .first()
+                )
+                if survey is None:
+                    return None
+                survey.simple_survey_date = timezone.now()
+                survey.user_id = user_id
+                survey.pooled = False
+                # Без FOR UPDATE (SQLite) опрос мог забрать параллельный запрос, тогда пробуем следующий.
+                if self.filter(pk=survey.pk, pooled=True).update(
+                    pooled=False, user_id=user_id, simple_survey_date=survey.simple_survey_date
+                ):
+                    return survey
+        return None
+
+    def with_questions(self):
+        """План запросов для SimpleSurveySerializer и SimpleSurveyResSerializer."""
+        return self.prefetch_related(*SURVEY_PREFETCH)
+
+    def submit(self, pk, answers):
+        """Сохраняет ответы {id результата: id ответа} и закрывает опрос pk.
+
+        Опрос закрывается условным UPDATE ... WHERE status = false до записи
+        ответов, поэтому из параллельных запросов ответы сохраняет только один.
+        Возвращает False, если опрос уже закрыт или не существует.
+        """
+        with transaction.atomic(using=self.db):
+            if not self.filter(pk=pk, status=False).update(status=True):
+                return False
+            results = list(
+                SimpleSurveyResult.objects.using(self.db)
+                .filter(simple_survey_id=pk)
+                .annotate(right_answer=F("question__right_answer"))
+            )
+            missing = set(answers) - {result.id for result in results}
+            if missing:
+                raise SimpleSurveyResult.DoesNotExist("Ответы не из этого опроса: {}".format(sorted(missing)))
+            answered_results = [result for result in results if result.id in answers]
+            for result in answered_results:
+                result.answered_id = answers[result.id]
+                result.answered = True
+                result.right_answered = result.answered_id == result.right_answer
+            SimpleSurveyResult.objects.using(self.db).bulk_update(
+                answered_results, ["answered_id", "answered", "right_answered"]
+            )
+            QuestionStats.record(results, using=self.db)
+        return True
+
+
 class SimpleSurvey(models.Model):
     simple_survey_date = models.DateTimeField("Время", auto_now_add=True)
     status = models.BooleanField("Статус", default=False)
     questions = models.ManyToManyField(Question, through="SimpleSurveyResult")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        related_name="simple_surveys",
+        null=True,
+        blank=True,
+    )
+
+    template = models.ForeignKey(
+        SurveyTemplate, verbose_name="Шаблон", on_delete=models.SET_NULL, null=True, blank=True
+    )
+    pooled = models.BooleanField("В резерве", default=False, editable=False)
+
+    objects = SimpleSurveyQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Опрос"
         verbose_name_plural = "Опросы"
+        indexes = [
+            models.Index(fields=["template", "id"], name="survey_pooled_idx", condition=Q(pooled=True)),
+            models.Index(fields=["simple_survey_date", "id"], name="survey_date_id_idx"),
+            models.Index(fields=["simple_survey_date"], name="survey_open_date_idx", condition=Q(status=False)),
+            models.Index(fields=["user", "status", "simple_survey_date"], name="survey_user_status_date_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         new_survey = False
         if not self.pk:
             new_survey = True
-        super().save(*args, **kwargs)
-        if new_survey:
-            question_list = random_list(Question, QUESTION_PER_SURVEY)
-            for item in question_list:
-                if item.answers.all().count() > 0:
-                    self.questions.add(
-                        item, through_defaults={"answered": False, "right_answered": False, "answered_id": 0}
-                    )
+        if not new_survey:
+            return super().save(*args, **kwargs)
+        if self.template_id is None:
+            self.template_id = question_pool.default_template()
+        (question_ids,) = question_pool.sample_existing_ids(
+            question_pool.strata(self.template_id), using=kwargs.get("using")
+        )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            SimpleSurveyResult.objects.bulk_create(
+                SimpleSurveyResult(
+                    simple_survey=self, question_id=question_id, answered=False, right_answered=False, answered_id=0
+                )
+                for question_id in question_ids
+            )
+
+    @property
+    def catalogue_questions(self):
+        """Вопросы опроса из каталога, без обращения к таблицам вопросов."""
+        return catalogue.get_many([result.question_id for result in self.simple_survey_result_set.all()])
 
     def simple_survey_close(self):
         self.status = True
@@ -130,7 +316,9 @@ class SimpleSurvey(models.Model):
 
 
 class SimpleSurveyResult(models.Model):
-    simple_survey = models.ForeignKey(SimpleSurvey, on_delete=models.CASCADE)
+    simple_survey = models.ForeignKey(
+        SimpleSurvey, on_delete=models.CASCADE, related_name="simple_survey_result_set", db_index=False
+    )
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     right_answered = models.BooleanField(default=False)
     answered_id = models.IntegerField(default=0)
@@ -139,6 +327,10 @@ class SimpleSurveyResult(models.Model):
     class Meta:
         verbose_name = "Статус ответа"
         verbose_name_plural = "Статусы ответов "
+        indexes = [models.Index(fields=["simple_survey", "id"], name="result_survey_id_idx")]
+        constraints = [
+            models.UniqueConstraint(fields=["simple_survey", "question"], name="result_survey_question_unique")
+        ]
 
     def __str__(self):
         return "#id {}".format(self.id)
@@ -149,3 +341,50 @@ class SimpleSurveyResult(models.Model):
         self.answered_id = answer_id
         self.save()
         return self
+
+
+# Результаты по id: тот же порядок отдает fast_serializers.
+SURVEY_PREFETCH = (Prefetch("simple_survey_result_set", queryset=SimpleSurveyResult.objects.order_by("id")),)
+
+
+class QuestionStats(models.Model):
+    question = models.OneToOneField(
+        Question, verbose_name="Вопрос", on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    served = models.PositiveIntegerField("Выдан в опросах", default=0)
+    answered = models.PositiveIntegerField("Получен ответ", default=0)
+    right_answered = models.PositiveIntegerField("Правильных ответов", default=0)
+
+    class Meta:
+        verbose_name = "Статистика вопроса"
+        verbose_name_plural = "Статистика вопросов"
+
+    def __str__(self):
+        return "#id {}".format(self.question_id)
+
+    @classmethod
+    def record(cls, results, using=None):
+        """Учитывает результаты закрытого опроса: по одному INSERT и UPDATE на опрос."""
+        served = [result.question_id for result in results]
+        answered = [result.question_id for result in results if result.answered]
+        right_answered = [result.question_id for result in results if result.right_answered]
+        manager = cls.objects.using(using)
+        manager.bulk_create([cls(question_id=question_id) for question_id in served], ignore_conflicts=True)
+        manager.filter(question_id__in=served).update(
+            served=F("served") + 1,
+            answered=F("answered") + Case(When(question_id__in=answered, then=1), default=0),
+            right_answered=F("right_answered") + Case(When(question_id__in=right_answered, then=1), default=0),
+        )
+
+
+class CatalogueVersion(models.Model):
+    """Версия банка вопросов в БД: одна строка, общая для всех процессов (см. catalogue)."""
+
+    version = models.PositiveBigIntegerField("Версия", default=1)
+
+    class Meta:
+        verbose_name = "Версия каталога вопросов"
+        verbose_name_plural = "Версии каталога вопросов"
+
+    def __str__(self):
+        return str(self.version)
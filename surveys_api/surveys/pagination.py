@@ -0,0 +1,81 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class SurveyCursorPagination(CursorPagination):
+    """Постраничный вывод опросов по ключу (simple_survey_date, id) без OFFSET.
+
+    Штатный CursorPagination фильтрует только по первому полю сортировки, а совпадения
+    времени добирает через OFFSET. Здесь в курсор кладётся пара (время, id), и следующая
+    страница выбирается построчным сравнением по этой паре, поэтому позиция всегда уникальна.
+    """
+    ordering = ("-simple_survey_date", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor.position if self.cursor is not None else None
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            queryset = queryset.filter(self.position_filter(current_position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = current_position is not None, following_position is not None
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next, self.has_previous = following_position is not None, current_position is not None
+            self.next_position, self.previous_position = following_position, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        # Позиция уникальна, смещение не нужно: курсоры с OFFSET не принимаем.
+        return cursor._replace(offset=0) if cursor is not None else None
+
+    def position_filter(self, position, reverse):
+        """Условие «строго после позиции» для пары (simple_survey_date, id) в текущем направлении обхода."""
+        date, _, pk = position.rpartition(",")
+        date = parse_datetime(date)
+        if date is None or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+
+        date_field, id_field = (field.lstrip("-") for field in self.ordering)
+        lookup = "__gt" if self.ordering[0].startswith("-") == reverse else "__lt"
+        return Q(**{date_field + lookup: date}) | Q(**{date_field: date, id_field + lookup: int(pk)})
+
+    def _get_position_from_instance(self, instance, ordering):
+        date_field, id_field = (field.lstrip("-") for field in ordering)
+        if isinstance(instance, dict):
+            date, pk = instance[date_field], instance[id_field]
+        else:
+            date, pk = getattr(instance, date_field), getattr(instance, id_field)
+        return "{},{}".format(date.isoformat(), pk)
+
+
+class QuestionStatsCursorPagination(CursorPagination):
+    ordering = "question_id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
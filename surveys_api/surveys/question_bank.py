@@ -0,0 +1,158 @@
+"""Потоковые импорт и экспорт банка вопросов в JSON Lines и CSV.
+
+Запись JSON Lines: {"question": "...", "image": "", "right_answer": 0,
+"answers": [{"answer": "...", "image": ""}, ...]}, где right_answer - номер
+правильного ответа в списке answers (с нуля) или null.
+
+Строка CSV: question, image, right_answer и далее по колонке на каждый ответ
+(изображения ответов в CSV не переносятся).
+"""
+import csv
+import json
+from itertools import islice
+
+from django.db import connection, transaction
+
+from .catalogue import catalogue
+from .models import Answer, Question
+from .question_pool import question_pool
+
+FORMATS = ("jsonl", "csv")
+CSV_HEADER = ("question", "image", "right_answer", "answers")
+
+
+def guess_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(stream, fmt):
+    if fmt == "csv":
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        if header is not None and tuple(header[:3]) != CSV_HEADER[:3]:
+            raise ValueError("Ожидался заголовок CSV: {}".format(",".join(CSV_HEADER)))
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            question, image, right_answer, *answers = row + [""] * (3 - len(row))
+            yield line, {
+                "question": question,
+                "image": image,
+                "right_answer": int(right_answer) if right_answer != "" else None,
+                "answers": [{"answer": answer, "image": ""} for answer in answers],
+            }
+    else:
+        for line, row in enumerate(stream, start=1):
+            if row.strip():
+                yield line, json.loads(row)
+
+
+def write_records(records, stream, fmt):
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(CSV_HEADER)
+        for record in records:
+            right_answer = "" if record["right_answer"] is None else record["right_answer"]
+            writer.writerow(
+                [record["question"], record["image"], right_answer]
+                + [answer["answer"] for answer in record["answers"]]
+            )
+    else:
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False))
+            stream.write("\n")
+
+
+def validate_record(line, record):
+    if not record.get("question"):
+        raise ValueError("Строка {}: нет текста вопроса".format(line))
+    answers = record.get("answers") or []
+    right_answer = record.get("right_answer")
+    if right_answer is not None and not 0 <= right_answer < len(answers):
+        raise ValueError("Строка {}: right_answer вне списка ответов".format(line))
+    return record
+
+
+def import_chunk(records):
+    """Создает вопросы и ответы одной пачки в отдельной транзакции."""
+    questions = [
+        Question(
+            question=record["question"],
+            image=record.get("image") or "",
+            answer_count=len(record.get("answers") or []),
+        )
+        for record in records
+    ]
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Question.objects.bulk_create(questions)
+        else:
+            for question in questions:
+                question.save()
+        answers = [
+            Answer(question=question, answer=answer["answer"], image=answer.get("image") or "")
+            for question, record in zip(questions, records)
+            for answer in record.get("answers") or []
+        ]
+        Answer.objects.bulk_create(answers)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            answer_ids = Answer.objects.filter(question__in=questions).order_by("id").values_list("id", flat=True)
+            for answer, answer_id in zip(answers, answer_ids):
+                answer.id = answer_id
+
+        answers = iter(answers)
+        with_right_answer = []
+        for question, record in zip(questions, records):
+            question_answers = list(islice(answers, len(record.get("answers") or [])))
+            if record.get("right_answer") is not None:
+                question.right_answer = question_answers[record["right_answer"]].id
+                with_right_answer.append(question)
+        Question.objects.bulk_update(with_right_answer, ["right_answer"])
+    return len(questions)
+
+
+def import_records(records, batch_size=1000):
+    """Импортирует записи пачками по batch_size; возвращает число вопросов."""
+    records = iter(records)
+    total = 0
+    try:
+        while True:
+            chunk = [validate_record(line, record) for line, record in islice(records, batch_size)]
+            if not chunk:
+                break
+            total += import_chunk(chunk)
+    finally:
+        # bulk_create не отправляет сигналы, поэтому сбрасываем кэши вручную.
+        question_pool.invalidate()
+        catalogue.bump()
+    return total
+
+
+def export_records(batch_size=1000):
+    """Перебирает банк вопросов пачками по id, не загружая его целиком."""
+    last_id = 0
+    while True:
+        questions = list(
+            Question.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "question", "image", "right_answer")[:batch_size]
+        )
+        if not questions:
+            break
+        answers = {}
+        for question_id, answer_id, answer, image in (
+            Answer.objects.filter(question_id__in=[question[0] for question in questions])
+            .order_by("id")
+            .values_list("question_id", "id", "answer", "image")
+        ):
+            answers.setdefault(question_id, []).append((answer_id, answer, image))
+        for question_id, question, image, right_answer in questions:
+            question_answers = answers.get(question_id, [])
+            answer_ids = [answer_id for answer_id, _, _ in question_answers]
+            yield {
+                "question": question,
+                "image": image,
+                "right_answer": answer_ids.index(right_answer) if right_answer in answer_ids else None,
+                "answers": [{"answer": answer, "image": image} for _, answer, image in question_answers],
+            }
+        last_id = questions[-1][0]
@@ -0,0 +1,150 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+QUESTION_POOL_CACHE_KEY = "surveys:question_pool"
+# Не больше параметров в одном id__in, чем допускают все поддерживаемые БД.
+EXISTING_IDS_BATCH_SIZE = 900
+
+
+class QuestionPool:
+    """Пул id вопросов с вариантами ответов, из которых собираются опросы.
+
+    Вместе с id пул хранит их разбивку по категориям и страты шаблонов
+    опросов, поэтому сборка опроса любого размера не требует запросов к
+    вопросам.
+
+    По умолчанию пул хранится в памяти процесса. Если в настройке
+    SURVEYS_QUESTION_POOL_CACHE указан alias кэша, пул хранится в нем
+    и становится общим для всех воркеров.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        return getattr(settings, "SURVEYS_QUESTION_POOL_TIMEOUT", 60)
+
+    @property
+    def cache(self):
+        alias = getattr(settings, "SURVEYS_QUESTION_POOL_CACHE", None)
+        return caches[alias] if alias else None
+
+    def load(self):
+        """Снимок пула: id вопросов, id по категориям и страты шаблонов опросов."""
+        from .models import Question, SurveyTemplate, SurveyTemplateStratum
+
+        categories = {}
+        for category_id, pk in Question.objects.filter(answer_count__gt=0).order_by().values_list("category_id", "id"):
+            categories.setdefault(category_id, []).append(pk)
+        templates = list(SurveyTemplate.objects.values_list("id", "question_count", "is_default"))
+        strata = {pk: [] for pk, _, _ in templates}
+        for template_id, category_id, count in SurveyTemplateStratum.objects.order_by("id").values_list(
+            "template_id", "category_id", "question_count"
+        ):
+            strata[template_id].append((category_id, count))
+        return {
+            "ids": tuple(pk for ids in categories.values() for pk in ids),
+            "categories": {category_id: tuple(ids) for category_id, ids in categories.items()},
+            "templates": {pk: tuple(strata[pk]) or ((None, question_count),) for pk, question_count, _ in templates},
+            "default_template": next((pk for pk, _, is_default in templates if is_default), None),
+        }
+
+    def snapshot(self):
+        cache = self.cache
+        if cache is not None:
+            snapshot = cache.get(QUESTION_POOL_CACHE_KEY)
+            if snapshot is None:
+                snapshot = self.load()
+                cache.set(QUESTION_POOL_CACHE_KEY, snapshot, self.timeout)
+            return snapshot
+
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._loaded_at > self.timeout:
+            with self._lock:
+                generation = self._generation
+                snapshot = self.load()
+                # Не сохраняем пул, если его сбросили, пока шла загрузка.
+                if generation == self._generation:
+                    self._snapshot = snapshot
+                    self._loaded_at = time.monotonic()
+        return snapshot
+
+    def ids(self):
+        return self.snapshot()["ids"]
+
+    def default_template(self):
+        return self.snapshot()["default_template"]
+
+    def strata(self, template_id=None):
+        """Страты шаблона ((id категории или None, число вопросов), ...).
+
+        Без шаблона используется шаблон по умолчанию, а если его нет -
+        SURVEYS_QUESTIONS_PER_SURVEY вопросов из любых категорий.
+        """
+        snapshot = self.snapshot()
+        strata = snapshot["templates"].get(template_id or snapshot["default_template"])
+        if strata is None:
+            strata = ((None, getattr(settings, "SURVEYS_QUESTIONS_PER_SURVEY", 3)),)
+        return strata
+
+    def invalidate(self):
+        self._generation += 1
+        self._snapshot = None
+        cache = self.cache
+        if cache is not None:
+            cache.delete(QUESTION_POOL_CACHE_KEY)
+
+    def sample_ids(self, strata):
+        """Случайные id вопросов по стратам без запросов к БД, если пул загружен.
+
+        Сначала выбираются страты с категорией, затем страты из любых
+        категорий, так что вопрос не попадает в опрос дважды.
+        """
+        snapshot = self.snapshot()
+        chosen = []
+        for category_id, count in sorted(strata, key=lambda stratum: stratum[0] is None):
+            if category_id is None:
+                candidates = snapshot["ids"]
+            else:
+                candidates = snapshot["categories"].get(category_id, ())
+            taken = set(chosen)
+            # Среди count + len(taken) разных id не меньше count еще не выбранных.
+            picked = random.sample(candidates, min(len(candidates), count + len(taken)))
+            chosen.extend([pk for pk in picked if pk not in taken][:count])
+        return chosen
+
+    def sample_existing_ids(self, strata, count=1, using=None):
+        """count выборок sample_ids без вопросов, которых уже нет в БД.
+
+        Вопрос, удаленный в обход сигналов (например, SQL-запросом), остается
+        в пуле до его истечения и дал бы IntegrityError при создании
+        результатов. Выборки проверяются одним запросом id__in; если в них
+        нашлись удаленные вопросы, пул сбрасывается и выборки строятся заново.
+        """
+        from .models import Question
+
+        for attempt in range(2):
+            samples = [self.sample_ids(strata) for _ in range(count)]
+            sampled = sorted({pk for sample in samples for pk in sample})
+            existing = set()
+            for start in range(0, len(sampled), EXISTING_IDS_BATCH_SIZE):
+                existing.update(
+                    Question.objects.using(using)
+                    .filter(id__in=sampled[start:start + EXISTING_IDS_BATCH_SIZE])
+                    .values_list("id", flat=True)
+                )
+            if len(existing) == len(sampled):
+                break
+            self.invalidate()
+        return [[pk for pk in sample if pk in existing] for sample in samples]
+
+
+question_pool = QuestionPool()
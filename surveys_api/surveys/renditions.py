@@ -0,0 +1,99 @@
+"""Уменьшенные копии изображений вопросов и ответов.
+
+После сохранения Question или Answer с новым изображением пул потоков строит
+копии шириной SURVEYS_IMAGE_RENDITION_WIDTHS в форматах
+SURVEYS_IMAGE_RENDITION_FORMATS и записывает их в поле image_renditions:
+{"source": имя оригинала, "items": [{"name", "width", "height", "format"}]}.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from .catalogue import catalogue
+
+FORMATS = {"webp": ("WEBP", "webp"), "jpeg": ("JPEG", "jpg")}
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "SURVEYS_IMAGE_RENDITION_WORKERS", 2),
+                thread_name_prefix="renditions",
+            )
+        return _executor
+
+
+def needs_renditions(instance):
+    return instance.image.name != instance.image_renditions.get("source", "")
+
+
+def render(name, storage=default_storage):
+    """Строит копии изображения name; копии не шире оригинала."""
+    with storage.open(name) as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    if original.mode not in ("RGB", "L"):
+        original = original.convert("RGB")
+    stem = os.path.splitext(os.path.basename(name))[0]
+    quality = getattr(settings, "SURVEYS_IMAGE_RENDITION_QUALITY", 80)
+    items = []
+    for width in getattr(settings, "SURVEYS_IMAGE_RENDITION_WIDTHS", (160, 480, 960)):
+        if width > original.width and items:
+            break
+        image = original.copy()
+        image.thumbnail((width, width * original.height // original.width or 1), Image.LANCZOS)
+        for fmt in getattr(settings, "SURVEYS_IMAGE_RENDITION_FORMATS", ("webp", "jpeg")):
+            pil_format, extension = FORMATS[fmt]
+            content = BytesIO()
+            image.save(content, pil_format, quality=quality, optimize=True)
+            saved = storage.save(
+                "renditions/{}_{}w.{}".format(stem, image.width, extension), ContentFile(content.getvalue())
+            )
+            items.append({"name": saved, "width": image.width, "height": image.height, "format": fmt})
+    return items
+
+
+def build(model, pk, name):
+    """Строит копии и сохраняет их, если изображение объекта не сменилось за это время.
+
+    Ошибка пишется в лог здесь: результат задачи из schedule никто не ждет.
+    """
+    try:
+        renditions = {"source": name, "items": render(name) if name else []}
+        updated = model.objects.filter(pk=pk, image=name).update(image_renditions=renditions)
+        if updated:
+            catalogue.bump()
+        return updated
+    except Exception:
+        logger.exception("Не удалось построить копии изображения %s (%s %s)", name, model.__name__, pk)
+        raise
+    finally:
+        close_old_connections()
+
+
+def schedule(instance):
+    """Ставит построение копий в пул потоков после коммита транзакции."""
+    model, pk, name = type(instance), instance.pk, instance.image.name
+    transaction.on_commit(lambda: get_executor().submit(build, model, pk, name))
+
+
+def urls(renditions, storage=default_storage):
+    return [
+        {"url": storage.url(item["name"]), "width": item["width"], "height": item["height"], "format": item["format"]}
+        for item in (renditions or {}).get("items", ())
+    ]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from .catalogue import catalogue
+
+RESULT_CACHE_KEY = "surveys:result:{version}:{pk}"
+
+
+def get_cache():
+    return caches[getattr(settings, "SURVEYS_RESULT_CACHE", "default")]
+
+
+def result_key(pk):
+    # Версия каталога в ключе сбрасывает результаты при правке вопросов и ответов.
+    return RESULT_CACHE_KEY.format(version=catalogue.version(), pk=pk)
+
+
+def get_result(pk):
+    """Пара (id владельца, ответ SimpleSurveyResSerializer) для закрытого опроса или None."""
+    return get_cache().get(result_key(pk))
+
+
+def set_result(pk, user_id, data):
+    get_cache().set(result_key(pk), (user_id, data), getattr(settings, "SURVEYS_RESULT_CACHE_TIMEOUT", None))
+
+
+def delete_result(pk):
+    get_cache().delete(result_key(pk))
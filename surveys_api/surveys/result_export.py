@@ -0,0 +1,81 @@
+"""Потоковая выгрузка SimpleSurveyResult для аналитики в CSV и NDJSON."""
+import csv
+import json
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import SimpleSurveyResult
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+HEADER = (
+    "id",
+    "simple_survey",
+    "simple_survey_date",
+    "status",
+    "user",
+    "question",
+    "answered",
+    "answered_id",
+    "right_answered",
+)
+FIELDS = (
+    "id",
+    "simple_survey_id",
+    "simple_survey__simple_survey_date",
+    "simple_survey__status",
+    "simple_survey__user_id",
+    "question_id",
+    "answered",
+    "answered_id",
+    "right_answered",
+)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def parse_since(value):
+    """Отметка since: дата или дата и время в ISO 8601."""
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError("Неверная отметка since: {}".format(value))
+        since = datetime.combine(date, time.min)
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, timezone.utc)
+    return since
+
+
+def result_rows(since=None, chunk_size=2000, using=None):
+    queryset = (
+        SimpleSurveyResult.objects.using(using)
+        .filter(simple_survey__pooled=False)
+        .order_by("simple_survey_id", "id")
+    )
+    if since is not None:
+        queryset = queryset.filter(simple_survey__simple_survey_date__gte=since)
+    for row in queryset.values_list(*FIELDS).iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[2] = row[2].isoformat()
+        yield row
+
+
+def result_lines(fmt, since=None, chunk_size=2000, using=None):
+    """Строки выгрузки по одной, без накопления в памяти."""
+    rows = result_rows(since=since, chunk_size=chunk_size, using=using)
+    if fmt == "csv":
+        writer = csv.writer(Echo())
+        yield writer.writerow(HEADER)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(HEADER, row))) + "\n"
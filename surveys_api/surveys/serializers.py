@@ -1,6 +1,8 @@
 from rest_framework import serializers
 
-from .models import Answer, Question, SimpleSurvey, SimpleSurveyResult, User
+from . import renditions
+from .metrics import TimedListSerializer, TimedSerializerMixin
+from .models import Answer, Question, QuestionStats, SimpleSurvey, SimpleSurveyResult, User
 
 
 class TokenObtainPairResponseSerializer(serializers.Serializer):
@@ -24,10 +26,19 @@ class TokenRefreshResponseSerializer(serializers.Serializer):
         raise NotImplementedError()
 
 
+class RenditionsField(serializers.ReadOnlyField):
+    """Список копий изображения: url, width, height, format."""
+
+    def to_representation(self, value):
+        return renditions.urls(value)
+
+
 class AnswerSerializer(serializers.ModelSerializer):
+    images = RenditionsField(source="image_renditions")
+
     class Meta:
         model = Answer
-        fields = ("id", "answer")
+        fields = ("id", "answer", "images")
 
 
 class ResultSerializer(serializers.ModelSerializer):
@@ -41,30 +52,61 @@ class ResultSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ResultAnswerSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    answered_id = serializers.IntegerField()
+
+    def create(self, validated_data):
+        raise NotImplementedError()
+
+    def update(self, instance, validated_data):
+        raise NotImplementedError()
+
+
+class SimpleSurveyAnswersSerializer(serializers.Serializer):
+    simple_survey_result = ResultAnswerSerializer(many=True)
+
+    def create(self, validated_data):
+        raise NotImplementedError()
+
+    def update(self, instance, validated_data):
+        raise NotImplementedError()
+
+
 class QuestionSerializer(serializers.ModelSerializer):
     answers = AnswerSerializer(many=True, read_only=True)
+    images = RenditionsField(source="image_renditions")
 
     class Meta:
         model = Question
-        fields = ("id", "question", "answers")
+        fields = ("id", "question", "images", "answers")
 
 
 class QuestionResSerializer(serializers.ModelSerializer):
     answers = AnswerSerializer(many=True, read_only=True)
+    images = RenditionsField(source="image_renditions")
 
     class Meta:
         model = Question
-        fields = ("id", "question", "answers", "right_answer")
+        fields = ("id", "question", "images", "answers", "right_answer")
+
+
+class QuestionStatsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = QuestionStats
+        list_serializer_class = TimedListSerializer
+        fields = ("question", "served", "answered", "right_answered")
 
 
-class SimpleSurveySerializer(serializers.ModelSerializer):
-    questions = QuestionSerializer(many=True, read_only=True)
+class SimpleSurveySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    questions = QuestionSerializer(source="catalogue_questions", many=True, read_only=True)
     simple_surveys_result = ResultSerializer(
-        source="simple_surveys_result_set", many=True
+        source="simple_survey_result_set", many=True
     )
 
     class Meta:
         model = SimpleSurvey
+        list_serializer_class = TimedListSerializer
         fields = (
             "id",
             "simple_survey_date",
@@ -75,14 +117,23 @@ class SimpleSurveySerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "simple_survey_date", "status", "questions"]
 
 
-class SimpleSurveyResSerializer(serializers.ModelSerializer):
-    questions = QuestionResSerializer(many=True, read_only=True)
+class SimpleSurveyListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = SimpleSurvey
+        list_serializer_class = TimedListSerializer
+        fields = ("id", "simple_survey_date", "status")
+        read_only_fields = fields
+
+
+class SimpleSurveyResSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    questions = QuestionResSerializer(source="catalogue_questions", many=True, read_only=True)
     simple_survey_result = ResultSerializer(
         source="simple_survey_result_set", many=True
     )
 
     class Meta:
         model = SimpleSurvey
+        list_serializer_class = TimedListSerializer
         fields = (
             "id",
             "simple_survey_date",
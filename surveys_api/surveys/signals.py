@@ -0,0 +1,89 @@
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import delete_user_flags
+from .catalogue import catalogue
+from .db_routers import close_unusable_connections
+from .metrics import install_query_recorder
+from .models import (
+    Answer,
+    Question,
+    QuestionCategory,
+    SimpleSurvey,
+    SimpleSurveyResult,
+    SurveyTemplate,
+    SurveyTemplateStratum,
+    User,
+)
+from .question_pool import question_pool
+from .renditions import needs_renditions, schedule
+from .result_cache import delete_result
+
+request_started.connect(close_unusable_connections)
+connection_created.connect(install_query_recorder)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def question_bank_changed(sender, **kwargs):
+    transaction.on_commit(question_pool.invalidate)
+    transaction.on_commit(catalogue.bump)
+
+
+@receiver(post_save, sender=QuestionCategory)
+@receiver(post_delete, sender=QuestionCategory)
+@receiver(post_save, sender=SurveyTemplate)
+@receiver(post_delete, sender=SurveyTemplate)
+@receiver(post_save, sender=SurveyTemplateStratum)
+@receiver(post_delete, sender=SurveyTemplateStratum)
+def survey_templates_changed(sender, **kwargs):
+    transaction.on_commit(question_pool.invalidate)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=Answer)
+def image_saved(sender, instance, **kwargs):
+    if needs_renditions(instance):
+        schedule(instance)
+
+
+@receiver(post_save, sender=SimpleSurvey)
+@receiver(post_delete, sender=SimpleSurvey)
+def survey_changed(sender, instance, created=False, **kwargs):
+    if not created:
+        transaction.on_commit(lambda: delete_result(instance.pk))
+
+
+@receiver(post_save, sender=SimpleSurveyResult)
+@receiver(post_delete, sender=SimpleSurveyResult)
+def survey_result_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: delete_result(instance.simple_survey_id))
+
+
+@receiver(post_save, sender=Answer)
+def answer_saved(sender, instance, created, **kwargs):
+    # Перенос ответа в другой вопрос (например, в админке) меняет answer_count обоих вопросов.
+    moved_from = None if created else getattr(instance, "_loaded_question_id", None)
+    moved = moved_from not in (None, instance.question_id)
+    instance._loaded_question_id = instance.question_id
+    if created or moved:
+        Question.objects.filter(pk=instance.question_id).update(answer_count=F("answer_count") + 1)
+    if moved:
+        Question.objects.filter(pk=moved_from, answer_count__gt=0).update(answer_count=F("answer_count") - 1)
+
+
+@receiver(post_delete, sender=Answer)
+def answer_deleted(sender, instance, **kwargs):
+    Question.objects.filter(pk=instance.question_id, answer_count__gt=0).update(answer_count=F("answer_count") - 1)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: delete_user_flags(instance.pk))
@@ -0,0 +1,36 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASHED_NAME_RE = re.compile(r"^[0-9a-f]{32}\.\w+$")
+
+
+def is_hashed_name(name):
+    return bool(HASHED_NAME_RE.match(os.path.basename(name)))
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """Хранит загрузки под именем из хэша содержимого.
+
+    Файл сохраняется как <каталог upload_to>/<sha256[:32]><расширение>, поэтому
+    одинаковые изображения не дублируются на диске, а по имени файла можно
+    раздавать его с Cache-Control: immutable.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        dirname, filename = os.path.split(name)
+        name = os.path.join(dirname, digest.hexdigest()[:32] + os.path.splitext(filename)[1].lower())
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
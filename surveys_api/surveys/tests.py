@@ -1,3 +1,1119 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, router
+from django.db.models import F, Max
+from django.http import HttpResponse
+from django.test import AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test import override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, resolve, reverse
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from surveys_api import urls as root_urls
+
+from . import db_routers, fast_serializers, metrics, question_bank, renditions, result_export, urls, views
+from .authentication import get_cache as get_auth_cache
+from .catalogue import catalogue
+from .middleware import ReplicaPinMiddleware
+from .models import (
+    Answer,
+    CatalogueVersion,
+    Question,
+    QuestionCategory,
+    QuestionStats,
+    SimpleSurvey,
+    SimpleSurveyResult,
+    SurveyTemplate,
+    SurveyTemplateStratum,
+    User,
+)
+from .question_pool import question_pool
+from .result_cache import get_cache, get_result
+from .serializers import SimpleSurveyListSerializer, SimpleSurveyResSerializer, SimpleSurveySerializer
+
+
+def create_questions(count, answers_per_question=3):
+    questions = []
+    for i in range(count):
+        question = Question.objects.create(question="Вопрос {}".format(i))
+        for j in range(answers_per_question):
+            answer = Answer.objects.create(question=question, answer="Ответ {}".format(j))
+        question.right_answer = answer.id
+        question.save()
+        questions.append(question)
+    return questions
+
+
+@contextmanager
+def capture_on_commit_callbacks(execute=False):
+    """Аналог captureOnCommitCallbacks из Django 3.2: внутри TestCase on_commit иначе не срабатывает."""
+    start = len(connection.run_on_commit)
+    callbacks = []
+    try:
+        yield callbacks
+    finally:
+        while True:
+            new = [callback for _, callback in connection.run_on_commit[start:]]
+            del connection.run_on_commit[start:]
+            callbacks.extend(new)
+            if not execute or not new:
+                break
+            for callback in new:
+                callback()
+
+
+def right_answers(survey):
+    return [
+        {"id": result.id, "answered_id": result.question.right_answer}
+        for result in survey.simple_survey_result_set.select_related("question")
+    ]
+
+
+class SurveyQueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", username="user", password="password")
+        create_questions(20)
+
+    def setUp(self):
+        question_pool.invalidate()
+        catalogue.clear()
+        get_cache().clear()
+        # Версия каталога читается из БД раз в SURVEYS_CATALOGUE_TIMEOUT секунд; бюджеты - для прочитанной.
+        catalogue.version()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_survey(self, question_count, status=False):
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=question_count):
+            survey = SimpleSurvey.objects.create(user=self.user)
+        if status:
+            survey.simple_survey_close()
+        self.assertEqual(survey.questions.count(), question_count)
+        return survey
+
+    def test_survey_get_query_count(self):
+        for question_count in (1, 5, 20):
+            survey = self.create_survey(question_count)
+            url = reverse("surveys:edit_survey", args=[survey.pk])
+            catalogue.clear()
+            with self.assertNumQueries(5):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data[0]["questions"]), question_count)
+            self.assertEqual(len(response.data[0]["simple_surveys_result"]), question_count)
+            with self.assertNumQueries(3):
+                self.client.get(url)
+
+    def test_survey_result_get_query_count(self):
+        for question_count in (1, 5, 20):
+            survey = self.create_survey(question_count, status=True)
+            url = reverse("surveys:survey_result", args=[survey.pk])
+            catalogue.clear()
+            with self.assertNumQueries(5):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data[0]["questions"]), question_count)
+            self.assertEqual(len(response.data[0]["simple_survey_result"]), question_count)
+
+    def test_survey_result_cached(self):
+        survey = self.create_survey(5, status=True)
+        url = reverse("surveys:survey_result", args=[survey.pk])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(url)
+        self.assertEqual(cached_response.data, response.data)
+
+        question = survey.questions.first()
+        question.question = "Новый текст"
+        with capture_on_commit_callbacks(execute=True) as callbacks:
+            question.save()
+        self.assertTrue(callbacks)
+        self.assertIsNone(get_result(survey.pk))
+        response = self.client.get(url)
+        self.assertIn("Новый текст", [item["question"] for item in response.data[0]["questions"]])
+
+        self.assertIsNotNone(get_result(survey.pk))
+        with capture_on_commit_callbacks(execute=True):
+            Answer.objects.filter(question=question).first().delete()
+        self.assertIsNone(get_result(survey.pk))
+        self.client.get(url)
+
+        self.assertIsNotNone(get_result(survey.pk))
+        result = survey.simple_survey_result_set.first()
+        result.answered_id = 1
+        with capture_on_commit_callbacks(execute=True):
+            result.save()
+        self.assertIsNone(get_result(survey.pk))
+
+    def test_survey_etag(self):
+        survey = self.create_survey(5)
+        for name in ("edit_survey", "survey_result"):
+            url = reverse("surveys:{}".format(name), args=[survey.pk])
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.content, b"")
+
+        etag = self.client.get(url)["ETag"]
+        self.submit(survey, right_answers(survey))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_survey_etag_covers_answers(self):
+        survey = self.create_survey(2, status=True)
+        first, second = survey.simple_survey_result_set.order_by("id")
+        SimpleSurveyResult.objects.filter(pk=first.pk).update(answered_id=1)
+        SimpleSurveyResult.objects.filter(pk=second.pk).update(answered_id=2)
+        url = reverse("surveys:survey_result", args=[survey.pk])
+        etag = self.client.get(url)["ETag"]
+        # Другой воркер: свои кэш и снимок каталога, тот же ETag.
+        catalogue.cache.clear()
+        catalogue.clear()
+        self.assertEqual(self.client.get(url)["ETag"], etag)
+
+        # Те же ответы в другом порядке: сумма answered_id не меняется.
+        SimpleSurveyResult.objects.filter(pk=first.pk).update(answered_id=2)
+        SimpleSurveyResult.objects.filter(pk=second.pk).update(answered_id=1)
+        get_cache().clear()
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+
+    def test_foreign_survey(self):
+        survey = self.create_survey(2, status=True)
+        other = User.objects.create_user(email="other@example.com", username="other", password="password")
+        self.client.get(reverse("surveys:survey_result", args=[survey.pk]))
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse("surveys:edit_survey", args=[survey.pk]))
+        self.assertEqual(response.data, [])
+        response = self.client.get(reverse("surveys:survey_result", args=[survey.pk]))
+        self.assertEqual(response.data, [])
+        response = self.submit(survey, right_answers(survey))
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_surveys(self):
+        open_survey = self.create_survey(1)
+        closed_survey = self.create_survey(1, status=True)
+        SimpleSurvey.objects.create()
+        url = reverse("surveys:user_surveys")
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual([item["id"] for item in response.data["results"]], [closed_survey.pk, open_survey.pk])
+        response = self.client.get(url, {"status": "false"})
+        self.assertEqual([item["id"] for item in response.data["results"]], [open_survey.pk])
+
+    @override_settings(SURVEYS_PREBUILT_POOL=True)
+    def test_create_from_pool(self):
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=4):
+            pooled = SimpleSurvey.objects.prebuild(2)
+        url = reverse("surveys:create_survey")
+        with self.assertNumQueries(7):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["id"], pooled[0].pk)
+        self.assertEqual(len(response.data["questions"]), 4)
+        self.assertEqual(SimpleSurvey.objects.get(pk=pooled[0].pk).user, self.user)
+
+        admin = User.objects.create_superuser(email="admin@example.com", username="admin", password="password")
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse("surveys:survey_list"))
+        self.assertEqual([item["id"] for item in response.data["results"]], [pooled[0].pk])
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(SimpleSurvey.objects.filter(pooled=True).exists())
+
+    def test_question_deleted_behind_pool(self):
+        question_pool.ids()
+        deleted = Question.objects.order_by("?").values_list("id", flat=True)[0]
+        # Удаление в обход сигналов: пул о нем не знает.
+        with connection.cursor() as cursor:
+            for model, column in ((QuestionStats, "question_id"), (Answer, "question_id"), (Question, "id")):
+                cursor.execute("DELETE FROM {} WHERE {} = %s".format(model._meta.db_table, column), [deleted])
+        self.assertIn(deleted, question_pool.ids())
+
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=19):
+            response = self.client.post(reverse("surveys:create_survey"))
+            self.assertEqual(response.status_code, 201)
+            surveys = [SimpleSurvey.objects.get(pk=response.data["id"])] + SimpleSurvey.objects.prebuild(3)
+        for survey in surveys:
+            question_ids = list(survey.simple_survey_result_set.values_list("question_id", flat=True))
+            self.assertEqual(len(question_ids), 19)
+            self.assertNotIn(deleted, question_ids)
+        self.assertNotIn(deleted, question_pool.ids())
+
+    def test_answer_moved_to_other_question(self):
+        first = Question.objects.create(question="Один ответ")
+        second = Question.objects.create(question="Другой")
+        Answer.objects.create(question=first, answer="Ответ")
+        Answer.objects.create(question=second, answer="Ответ")
+        answer = Answer.objects.get(question=first)
+        answer.question = second
+        answer.save()
+        answer.answer = "Исправленный ответ"
+        answer.save()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.answer_count, second.answer_count), (0, 2))
+        question_pool.invalidate()
+        self.assertNotIn(first.pk, question_pool.ids())
+
+    def submit(self, survey, answers):
+        return self.client.put(
+            reverse("surveys:edit_survey", args=[survey.pk]), {"simple_survey_result": answers}, format="json"
+        )
+
+    def test_survey_put_query_count(self):
+        for question_count in (1, 5, 20):
+            survey = self.create_survey(question_count)
+            answers = right_answers(survey)
+            catalogue.clear()
+            with self.assertNumQueries(11):
+                response = self.submit(survey, answers)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.data["status"])
+            results = response.data["simple_survey_result"]
+            self.assertEqual(len(results), question_count)
+            self.assertEqual(survey.simple_survey_result_set.filter(answered=True, right_answered=True).count(),
+                             question_count)
+
+    def test_question_stats(self):
+        survey = self.create_survey(3)
+        answers = right_answers(survey)
+        answers[1]["answered_id"] = 0
+        self.submit(survey, answers[:2])
+        stats = {
+            item.question_id: (item.served, item.answered, item.right_answered)
+            for item in QuestionStats.objects.all()
+        }
+        results = list(survey.simple_survey_result_set.order_by("id"))
+        self.assertEqual(
+            stats,
+            {results[0].question_id: (1, 1, 1), results[1].question_id: (1, 1, 0), results[2].question_id: (1, 0, 0)},
+        )
+        admin = User.objects.create_superuser(email="admin@example.com", username="admin", password="password")
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse("surveys:question_stats"))
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_survey_put_foreign_result(self):
+        survey = self.create_survey(2)
+        other = self.create_survey(2)
+        result = other.simple_survey_result_set.first()
+        response = self.client.put(
+            reverse("surveys:edit_survey", args=[survey.pk]),
+            {"simple_survey_result": [{"id": result.id, "answered_id": 1}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        survey.refresh_from_db()
+        self.assertFalse(survey.status)
+
+    def test_survey_put_closed(self):
+        survey = self.create_survey(2, status=True)
+        answers = [{"id": result.id, "answered_id": 0} for result in survey.simple_survey_result_set.all()]
+        response = self.submit(survey, answers)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(survey.simple_survey_result_set.filter(answered=True).exists())
+
+
+class CatalogueTest(TestCase):
+    def setUp(self):
+        catalogue.cache.clear()
+        catalogue.clear()
+
+    def test_snapshot_expires(self):
+        question = create_questions(1)[0]
+        self.assertEqual(catalogue.get_many([question.pk])[0].question, "Вопрос 0")
+        # Правка в другом воркере: сигнал сюда не доходит.
+        Question.objects.filter(pk=question.pk).update(question="Новый текст")
+        self.assertEqual(catalogue.get_many([question.pk])[0].question, "Вопрос 0")
+        later = time.monotonic() + catalogue.timeout + 1
+        with mock.patch("surveys.catalogue.time.monotonic", return_value=later):
+            self.assertEqual(catalogue.get_many([question.pk])[0].question, "Новый текст")
+
+    def test_version_from_db(self):
+        version = catalogue.version()
+        # Другой процесс со своим кэшем видит ту же версию.
+        catalogue.cache.clear()
+        self.assertEqual(catalogue.version(), version)
+        later = time.time() + catalogue.timeout + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(catalogue.version(), version)
+
+        # bump() в другом воркере: с LocMemCache версия здесь обновится, когда истечет.
+        CatalogueVersion.objects.update(version=F("version") + 1)
+        self.assertEqual(catalogue.version(), version)
+        later += catalogue.timeout + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(catalogue.version(), version + 1)
+        catalogue.bump()
+        self.assertEqual(catalogue.version(), version + 2)
+
+
+@skipUnlessDBFeature("test_db_allows_multiple_connections")
+class SurveyConcurrentSubmitTest(TransactionTestCase):
+    def test_parallel_put(self):
+        user = User.objects.create_user(email="user@example.com", username="user", password="password")
+        create_questions(5)
+        question_pool.invalidate()
+        survey = SimpleSurvey.objects.create(user=user)
+        answers = right_answers(survey)
+        url = reverse("surveys:edit_survey", args=[survey.pk])
+        barrier = threading.Barrier(8)
+        statuses = []
+
+        def put():
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                response = client.put(url, {"simple_survey_result": answers}, format="json")
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=put) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [200] + [409] * 7)
+        survey.refresh_from_db()
+        self.assertTrue(survey.status)
+        self.assertEqual(survey.simple_survey_result_set.filter(right_answered=True).count(), len(answers))
+
+
+class SurveyListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(email="admin@example.com", username="admin", password="password")
+        create_questions(3)
+        question_pool.invalidate()
+        for _ in range(7):
+            SimpleSurvey.objects.create()
+
+    def test_cursor_pages(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse("surveys:survey_list") + "?page_size=3"
+        ids = []
+        while url:
+            with self.assertNumQueries(1):
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        expected = SimpleSurvey.objects.order_by("-simple_survey_date", "-id").values_list("id", flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_cursor_pages_same_date(self):
+        SimpleSurvey.objects.update(simple_survey_date=datetime.now(timezone.utc))
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        url = reverse("surveys:survey_list") + "?page_size=3"
+        pages = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([item["id"] for item in response.data["results"]])
+            url = response.data["next"]
+        expected = list(SimpleSurvey.objects.order_by("-id").values_list("id", flat=True))
+        self.assertEqual(sum(pages, []), expected)
+
+        response = client.get(response.data["previous"])
+        self.assertEqual([item["id"] for item in response.data["results"]], pages[-2])
+
+
+class QuestionBankTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_questions(3)
+        no_right_answer = Question.objects.create(question="Без правильного ответа")
+        Answer.objects.create(question=no_right_answer, answer="Единственный ответ")
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        question_pool.invalidate()
+        catalogue.cache.clear()
+
+    def export(self, fmt):
+        path = "{}/questions.{}".format(self.tmp, fmt)
+        call_command("export_questions", path, batch_size=2)
+        with open(path, encoding="utf-8", newline="") as stream:
+            return path, [record for _, record in question_bank.read_records(stream, fmt)]
+
+    def round_trip(self, fmt):
+        path, exported = self.export(fmt)
+        Question.objects.all().delete()
+        old_pool, old_version = question_pool.ids(), catalogue.version()
+        with mock.patch.object(question_pool, "invalidate", wraps=question_pool.invalidate) as invalidate:
+            call_command("import_questions", path, batch_size=2, stdout=StringIO())
+        invalidate.assert_called()
+        self.assertNotEqual(catalogue.version(), old_version)
+        imported = list(Question.objects.order_by("id").values_list("id", flat=True))
+        self.assertEqual(sorted(question_pool.ids()), imported)
+        self.assertNotEqual(question_pool.ids(), old_pool)
+
+        for question in Question.objects.prefetch_related("answers"):
+            answers = {answer.id: answer.answer for answer in question.answers.all()}
+            self.assertEqual(question.answer_count, len(answers))
+            if question.question.startswith("Вопрос"):
+                self.assertEqual(answers.get(question.right_answer), "Ответ 2")
+            else:
+                self.assertNotIn(question.right_answer, answers)
+        self.assertEqual(self.export(fmt)[1], exported)
+        return exported
+
+    def test_jsonl_round_trip(self):
+        exported = self.round_trip("jsonl")
+        self.assertEqual([record["right_answer"] for record in exported], [2, 2, 2, None])
+
+    def test_csv_round_trip(self):
+        self.round_trip("csv")
+
+    def test_export_to_stdout(self):
+        _, exported = self.export("jsonl")
+        stdout = StringIO()
+        call_command("export_questions", "-", batch_size=2, stdout=stdout)
+        stdout.seek(0)
+        self.assertEqual([record for _, record in question_bank.read_records(stdout, "jsonl")], exported)
+
+    def test_per_row_fallback(self):
+        # На бэкендах без RETURNING при bulk_create вопросы сохраняются по одному.
+        with mock.patch.object(connection.features, "can_return_rows_from_bulk_insert", False):
+            self.round_trip("jsonl")
+
+    def test_invalid_right_answer(self):
+        path = "{}/questions.jsonl".format(self.tmp)
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write('{"question": "Вопрос", "right_answer": 1, "answers": [{"answer": "Ответ"}]}\n')
+        with self.assertRaisesMessage(CommandError, "Строка 1: right_answer вне списка ответов"):
+            call_command("import_questions", path)
+
+
+class ResultExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", username="user", password="password")
+        cls.admin = User.objects.create_user(
+            email="admin@example.com", username="admin", password="password", is_staff=True
+        )
+        create_questions(3)
+        question_pool.invalidate()
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=2):
+            cls.old = SimpleSurvey.objects.create(user=cls.user)
+            cls.new = SimpleSurvey.objects.create(user=cls.user)
+            SimpleSurvey.objects.prebuild(1)
+        cls.new.simple_survey_close()
+        SimpleSurvey.objects.filter(pk=cls.old.pk).update(simple_survey_date=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        SimpleSurvey.objects.filter(pk=cls.new.pk).update(simple_survey_date=datetime(2021, 6, 1, tzinfo=timezone.utc))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse("surveys:result_export"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(csv.reader(StringIO(content)))
+        self.assertEqual(tuple(rows[0]), result_export.HEADER)
+        expected = SimpleSurveyResult.objects.filter(simple_survey__in=[self.old, self.new]).order_by(
+            "simple_survey_id", "id"
+        )
+        self.assertEqual([int(row[0]) for row in rows[1:]], [result.id for result in expected])
+        self.assertEqual(rows[1][2], "2020-01-01T00:00:00+00:00")
+
+    def test_ndjson_since(self):
+        response, content = self.export(output="ndjson", since="2021-01-01")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(records), 2)
+        self.assertEqual({record["simple_survey"] for record in records}, {self.new.pk})
+        self.assertTrue(all(record["status"] and record["user"] == self.user.pk for record in records))
+
+        _, content = self.export(output="ndjson", since="2021-06-01T00:00:01+00:00")
+        self.assertEqual(content, "")
+
+    def test_command_stdout(self):
+        _, content = self.export(output="ndjson", since="2021-01-01")
+        stdout = StringIO()
+        call_command("export_results", "-", format="ndjson", since="2021-01-01", stdout=stdout)
+        self.assertEqual(stdout.getvalue(), content)
+
+    def test_bad_params(self):
+        url = reverse("surveys:result_export")
+        response = self.client.get(url, {"since": "вчера"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("since", response.data)
+        self.assertEqual(self.client.get(url, {"output": "xml"}).status_code, 400)
+
+    def test_staff_only(self):
+        url = reverse("surveys:result_export")
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+
+class AsyncViewsTest(TransactionTestCase):
+    """Горячие пути под ASGI: surveys.urls пересобирается с SURVEYS_ASYNC_VIEWS=1."""
+
+    @staticmethod
+    def reload_urls():
+        importlib.reload(urls)
+        importlib.reload(root_urls)
+        clear_url_caches()
+
+    def setUp(self):
+        with override_settings(SURVEYS_ASYNC_VIEWS=True):
+            self.reload_urls()
+        self.addCleanup(self.reload_urls)
+        question_pool.invalidate()
+        catalogue.clear()
+        get_cache().clear()
+        get_auth_cache().clear()
+        self.user = User.objects.create_user(email="user@example.com", username="user", password="password")
+        create_questions(3)
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=3):
+            self.survey = SimpleSurvey.objects.create(user=self.user)
+        self.client = AsyncClient()
+
+    def headers(self, body=b"", **headers):
+        # AsyncRequestFactory в Django 3.1 пишет неверный content-length, поэтому заголовки задаем целиком.
+        headers = dict(
+            {"host": "testserver", "authorization": "JWT {}".format(AccessToken.for_user(self.user))}, **headers
+        )
+        if body:
+            headers.update({"content-type": "application/json", "content-length": str(len(body))})
+        return [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+
+    async def request(self, method, url, data=None, **headers):
+        body = json.dumps(data).encode() if data is not None else b""
+        return await getattr(self.client, method)(url, data=body, headers=self.headers(body, **headers))
+
+    async def test_get_and_put(self):
+        url = reverse("surveys:edit_survey", args=[self.survey.pk])
+        self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+        threads = []
+        close_old_connections = mock.Mock(side_effect=lambda: threads.append(threading.get_ident()))
+        with mock.patch("surveys.async_views.close_old_connections", close_old_connections):
+            response = await self.request("get", url)
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+            self.assertEqual((await self.request("get", url, if_none_match=etag)).status_code, 304)
+
+            results = json.loads(response.content)[0]["simple_surveys_result"]
+            answers = [{"id": result["id"], "answered_id": 0} for result in results]
+            response = await self.request("put", url, {"simple_survey_result": answers})
+            self.assertEqual(response.status_code, 200)
+            response = await self.request("get", url, if_none_match=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+        # thread_sensitive=False: ORM-код идет в потоках пула, а не в потоке теста, и соединения
+        # закрываются до и после каждого представления.
+        self.assertEqual(len(threads), 2 * 4)
+        self.assertNotIn(threading.get_ident(), threads)
+        self.assertEqual(await sync_to_async(SimpleSurvey.objects.filter(pk=self.survey.pk, status=True).count)(), 1)
+
+
+class StatelessAuthTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", username="user", password="password")
+
+    def setUp(self):
+        get_auth_cache().clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION="JWT {}".format(AccessToken.for_user(self.user)))
+
+    def test_no_user_lookup_with_warm_cache(self):
+        url = reverse("surveys:user_surveys")
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_inactive_user(self):
+        self.user.is_active = False
+        self.user.save()
+        get_auth_cache().clear()
+        response = self.client.get(reverse("surveys:user_surveys"))
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(SURVEYS_DB_REPLICA="replica")
+class ReplicaRouterTest(SimpleTestCase):
+    def read_db(self, request, write=False):
+        token = db_routers.start_request(request)
+        try:
+            if write:
+                router.db_for_write(SimpleSurvey)
+            return router.db_for_read(SimpleSurvey)
+        finally:
+            db_routers.finish_request(token)
+
+    def test_routing(self):
+        factory = RequestFactory()
+        self.assertEqual(self.read_db(factory.get("/")), "replica")
+        self.assertEqual(self.read_db(factory.get("/"), write=True), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.read_db(factory.put("/")), DEFAULT_DB_ALIAS)
+        request = factory.get("/")
+        request.COOKIES[db_routers.PIN_COOKIE] = "1"
+        self.assertEqual(self.read_db(request), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_read(SimpleSurvey), DEFAULT_DB_ALIAS)
+
+    def test_pin_by_user(self):
+        # JWT-клиенты часто не хранят cookie: закрепление по id пользователя.
+        def write(request):
+            router.db_for_write(SimpleSurvey)
+            return HttpResponse()
+
+        factory = RequestFactory()
+        writer, other = User(id=1001), User(id=1002)
+        self.addCleanup(db_routers.get_pin_cache().delete, db_routers.USER_PIN_KEY.format(writer.id))
+        request = factory.post("/")
+        request.user = writer
+        ReplicaPinMiddleware(write)(request)
+        for user, expected in ((writer, DEFAULT_DB_ALIAS), (other, "replica"), (None, "replica")):
+            request = factory.get("/")
+            if user is not None:
+                request.user = user
+            self.assertEqual(self.read_db(request), expected)
+
+    def test_streamed_export(self):
+        # Строки выгрузки читаются уже после ReplicaPinMiddleware, БД выбирается заранее.
+        view = ReplicaPinMiddleware(views.ResultExportView.as_view())
+        factory = APIRequestFactory()
+        usings = []
+
+        def result_lines(output, since=None, using=None):
+            usings.append(using)
+            return iter(())
+
+        with mock.patch("surveys.views.result_lines", result_lines):
+            for pinned in (False, True):
+                request = factory.get("/")
+                if pinned:
+                    request.COOKIES[db_routers.PIN_COOKIE] = "1"
+                force_authenticate(request, user=User(is_staff=True))
+                view(request)
+        self.assertEqual(usings, ["replica", DEFAULT_DB_ALIAS])
+
+    def test_pin_after_write(self):
+        def write(request):
+            router.db_for_write(SimpleSurvey)
+            return HttpResponse()
+
+        factory = RequestFactory()
+        response = ReplicaPinMiddleware(write)(factory.post("/"))
+        self.assertIn(db_routers.PIN_COOKIE, response.cookies)
+        response = ReplicaPinMiddleware(lambda request: HttpResponse())(factory.get("/"))
+        self.assertNotIn(db_routers.PIN_COOKIE, response.cookies)
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", username="user", password="password")
+
+    def setUp(self):
+        metrics.HISTOGRAMS["queries"].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_server_timing(self):
+        with self.assertLogs("surveys.metrics", "INFO") as logs:
+            response = self.client.get(reverse("surveys:user_surveys"))
+        self.assertRegex(
+            response["Server-Timing"],
+            r'^db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=',
+        )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record["view"], record["queries"]), ("surveys:user_surveys", 1))
+        self.assertIn("serialize_ms", record)
+
+    def test_serialize_time(self):
+        request_metrics = metrics.RequestMetrics()
+        token = metrics._current.set(request_metrics)
+        try:
+            SimpleSurveyListSerializer(SimpleSurvey.objects.none(), many=True).data
+        finally:
+            metrics._current.reset(token)
+        self.assertGreater(request_metrics.serialize_time, 0)
+
+    @override_settings(SURVEYS_METRICS_ENDPOINT=True, SURVEYS_METRICS_TOKEN="secret")
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("surveys:user_surveys"))
+        url = reverse("surveys:metrics")
+        client = Client()
+        self.assertEqual(client.get(url).status_code, 403)
+        self.assertEqual(client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        client.force_login(self.user)
+        self.assertEqual(client.get(url).status_code, 403)
+
+        response = Client().get(url, HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'surveys_request_queries_bucket{method="GET",view="surveys:user_surveys",le="1"} 1',
+            response.content.decode(),
+        )
+        staff = User.objects.create_user(
+            email="staff@example.com", username="staff", password="password", is_staff=True
+        )
+        client.force_login(staff)
+        self.assertEqual(client.get(url).status_code, 200)
+
+
+def create_question_bank(question_count, answers_per_question=4):
+    """Банк вопросов через bulk_create; answer_count заполняется сразу, сигналы не нужны."""
+    first_id = (Question.objects.aggregate(last_id=Max("id"))["last_id"] or 0) + 1
+    Question.objects.bulk_create(
+        Question(question="Вопрос {}".format(i), answer_count=answers_per_question) for i in range(question_count)
+    )
+    question_ids = list(Question.objects.filter(id__gte=first_id).values_list("id", flat=True))
+    Answer.objects.bulk_create(
+        Answer(question_id=question_id, answer="Ответ {}".format(j))
+        for question_id in question_ids
+        for j in range(answers_per_question)
+    )
+    return question_ids
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class EndpointBudgetTest(TestCase):
+    """Верхние границы числа SQL-запросов для каждого маршрута на большом банке вопросов.
+
+    Время ответа проверяется только при SURVEYS_TEST_MAX_RESPONSE_TIME=<секунды>: на общих CI-машинах
+    оно нестабильно.
+    """
+
+    QUESTION_COUNT = 2000
+    SURVEY_COUNT = 200
+    RESULTS_PER_SURVEY = 50
+    LARGE_SURVEY_QUESTIONS = 100
+    MAX_RESPONSE_TIME = float(os.environ.get("SURVEYS_TEST_MAX_RESPONSE_TIME", 0))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", username="user", password="password")
+        cls.admin = User.objects.create_superuser(email="admin@example.com", username="admin", password="password")
+        question_ids = create_question_bank(cls.QUESTION_COUNT)
+        sample = random.Random(0).sample
+        SimpleSurvey.objects.bulk_create(
+            SimpleSurvey(user=cls.user, status=i % 2 == 0) for i in range(cls.SURVEY_COUNT)
+        )
+        SimpleSurveyResult.objects.bulk_create(
+            SimpleSurveyResult(simple_survey_id=survey_id, question_id=question_id, answered=True)
+            for survey_id in SimpleSurvey.objects.values_list("id", flat=True)
+            for question_id in sample(question_ids, cls.RESULTS_PER_SURVEY)
+        )
+
+    def setUp(self):
+        question_pool.invalidate()
+        catalogue.clear()
+        get_cache().clear()
+        # Версия каталога читается из БД раз в SURVEYS_CATALOGUE_TIMEOUT секунд; бюджеты - для прочитанной.
+        catalogue.version()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def large_survey(self):
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=self.LARGE_SURVEY_QUESTIONS):
+            return SimpleSurvey.objects.create(user=self.user)
+
+    def request(self, max_queries, method, url, data=None, status=200, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, data, format="json", **extra)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        self.assertEqual(response.status_code, status, getattr(response, "data", None))
+        self.assertLessEqual(
+            len(queries), max_queries, "\n".join(query["sql"] for query in queries.captured_queries)
+        )
+        if self.MAX_RESPONSE_TIME:
+            self.assertLess(elapsed, self.MAX_RESPONSE_TIME)
+        return response
+
+    def test_token_auth(self):
+        self.client.force_authenticate(None)
+        response = self.request(
+            1, "post", reverse("surveys:token_obtain_pair"), {"email": "user@example.com", "password": "password"}
+        )
+        self.request(0, "post", reverse("surveys:token_refresh"), {"refresh": response.data["refresh"]})
+
+    def test_survey_create(self):
+        self.request(11, "post", reverse("surveys:create_survey"), status=201)
+
+    def test_survey_get_and_put(self):
+        survey = self.large_survey()
+        catalogue.clear()
+        url = reverse("surveys:edit_survey", args=[survey.pk])
+        self.request(5, "get", url)
+        self.request(11, "put", url, {"simple_survey_result": right_answers(survey)})
+        catalogue.clear()
+        self.request(5, "get", reverse("surveys:survey_result", args=[survey.pk]))
+
+    def test_survey_lists(self):
+        self.request(1, "get", reverse("surveys:user_surveys"))
+        self.client.force_authenticate(self.admin)
+        self.request(1, "get", reverse("surveys:survey_list"))
+        self.request(1, "get", reverse("surveys:question_stats"))
+        self.request(1, "get", reverse("surveys:result_export"), {"output": "ndjson"})
+
+    def test_users(self):
+        self.client.force_authenticate(None)
+        response = self.request(
+            2,
+            "post",
+            reverse("surveys:create_user"),
+            {"email": "new@example.com", "username": "new", "password": "password"},
+            status=201,
+        )
+        self.client.force_authenticate(self.admin)
+        self.request(2, "patch", reverse("surveys:edit_user", args=[response.data["id"]]), {"username": "renamed"})
+
+
+def use_temp_media(test):
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    settings_override = override_settings(MEDIA_ROOT=media_root)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+
+
+def png_upload(width, height):
+    content = BytesIO()
+    Image.new("RGBA", (width, height), (255, 0, 0, 128)).save(content, "PNG")
+    return SimpleUploadedFile("picture.png", content.getvalue(), content_type="image/png")
+
+
+class ImmediateExecutor:
+    """Вместо пула потоков renditions: задача выполняется сразу, в потоке теста и его транзакции."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+@override_settings(SURVEYS_IMAGE_RENDITION_WIDTHS=(160, 480, 960))
+class RenditionsTest(TestCase):
+    def setUp(self):
+        use_temp_media(self)
+        question_pool.invalidate()
+        catalogue.clear()
+
+    def test_build_renditions(self):
+        question = Question.objects.create(question="Вопрос", image=png_upload(600, 300))
+        Answer.objects.create(question=question, answer="Ответ")
+        with mock.patch("surveys.renditions.close_old_connections"):
+            self.assertEqual(renditions.build(Question, question.pk, question.image.name), 1)
+        question.refresh_from_db()
+        items = question.image_renditions["items"]
+        self.assertEqual(question.image_renditions["source"], question.image.name)
+        self.assertEqual(
+            [(item["width"], item["height"], item["format"]) for item in items],
+            [(160, 80, "webp"), (160, 80, "jpeg"), (480, 240, "webp"), (480, 240, "jpeg")],
+        )
+        self.assertFalse(renditions.needs_renditions(question))
+
+        user = User.objects.create_user(email="user@example.com", username="user", password="password")
+        survey = SimpleSurvey.objects.create(user=user)
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(reverse("surveys:edit_survey", args=[survey.pk]))
+        images = response.data[0]["questions"][0]["images"]
+        self.assertEqual(images[0], {"url": "/media/" + items[0]["name"], "width": 160, "height": 80, "format": "webp"})
+        self.assertEqual(response.data[0]["questions"][0]["answers"][0]["images"], [])
+
+    @mock.patch("surveys.renditions.close_old_connections")
+    @mock.patch("surveys.renditions.get_executor", ImmediateExecutor)
+    def test_build_after_commit(self, close_old_connections):
+        with capture_on_commit_callbacks(execute=True) as callbacks:
+            question = Question.objects.create(question="Вопрос", image=png_upload(600, 300))
+        self.assertTrue(callbacks)
+        question.refresh_from_db()
+        self.assertEqual(question.image_renditions["source"], question.image.name)
+        self.assertEqual(len(question.image_renditions["items"]), 4)
+        close_old_connections.assert_called_once_with()
+
+        # Ошибка в задаче пула не теряется вместе с future, а попадает в лог.
+        with mock.patch("surveys.renditions.render", side_effect=OSError("broken image")):
+            with self.assertLogs("surveys.renditions", "ERROR") as logs, capture_on_commit_callbacks(execute=True):
+                question.image = png_upload(300, 300)
+                question.save()
+        self.assertIn("broken image", logs.output[0])
+        question.refresh_from_db()
+        self.assertNotEqual(question.image_renditions["source"], question.image.name)
+
+    def test_small_image(self):
+        question = Question.objects.create(question="Вопрос", image=png_upload(100, 50))
+        items = renditions.render(question.image.name)
+        self.assertEqual([(item["width"], item["height"]) for item in items], [(100, 50), (100, 50)])
+
+
+class MediaStorageTest(TestCase):
+    def setUp(self):
+        use_temp_media(self)
+
+    def test_hashed_names_and_dedup(self):
+        first = Question.objects.create(question="Вопрос 1", image=png_upload(20, 10))
+        second = Question.objects.create(question="Вопрос 2", image=png_upload(20, 10))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^question/[0-9a-f]{32}\.png$")
+
+    def test_serve_media(self):
+        question = Question.objects.create(question="Вопрос", image=png_upload(20, 10))
+        url = question.image.url
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(response["Content-Type"], "image/png")
+        content = b"".join(response.streaming_content)
+        self.assertEqual(content, question.image.read())
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_RANGE="bytes=0-3")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 0-3/{}".format(len(content)))
+        self.assertEqual(response["Content-Length"], "4")
+        self.assertEqual(self.client.get("/media/../manage.py").status_code, 404)
+
+
+class SurveyTemplateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.math = QuestionCategory.objects.create(name="Математика")
+        cls.history = QuestionCategory.objects.create(name="История")
+        for category, count in ((cls.math, 5), (cls.history, 5), (None, 5)):
+            for question in create_questions(count):
+                question.category = category
+                question.save()
+        cls.template = SurveyTemplate.objects.create(name="Экзамен", is_default=True)
+        SurveyTemplateStratum.objects.create(template=cls.template, category=cls.math, question_count=2)
+        SurveyTemplateStratum.objects.create(template=cls.template, category=cls.history, question_count=1)
+        SurveyTemplateStratum.objects.create(template=cls.template, question_count=10)
+
+    def setUp(self):
+        question_pool.invalidate()
+
+    def test_stratified_survey(self):
+        survey = SimpleSurvey.objects.create()
+        self.assertEqual(survey.template, self.template)
+        categories = list(survey.simple_survey_result_set.order_by("id").values_list("question__category", flat=True))
+        self.assertEqual(len(categories), 13)
+        self.assertEqual(categories[:3], [self.math.pk, self.math.pk, self.history.pk])
+
+    def test_template_question_count(self):
+        template = SurveyTemplate.objects.create(name="Короткий", question_count=4)
+        self.assertEqual(SimpleSurvey.objects.create(template=template).questions.count(), 4)
+        SurveyTemplate.objects.update(is_default=False)
+        question_pool.invalidate()
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=2):
+            self.assertEqual(SimpleSurvey.objects.create().questions.count(), 2)
+
+    def test_refill_after_default_change(self):
+        SimpleSurvey.objects.prebuild(3)
+        SurveyTemplate.objects.update(is_default=False)
+        template = SurveyTemplate.objects.create(name="Новый", question_count=4, is_default=True)
+        stdout = StringIO()
+        call_command("fill_survey_pool", size=3, stdout=stdout)
+        self.assertIn("удалено опросов других шаблонов: 3", stdout.getvalue())
+        pooled = SimpleSurvey.objects.filter(pooled=True)
+        self.assertEqual(list(pooled.values_list("template", flat=True)), [template.pk] * 3)
+        survey = SimpleSurvey.objects.claim(None)
+        self.assertEqual(survey.template_id, template.pk)
+        self.assertEqual(survey.questions.count(), 4)
+
+
+class FastSerializationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="user@example.com", username="user", password="password")
+        questions = create_questions(12)
+        questions[0].image_renditions = {
+            "source": "question/a.png",
+            "items": [{"name": "renditions/a.webp", "width": 160, "height": 80, "format": "webp"}],
+        }
+        questions[0].question = 'Вопрос с "кавычками" и \\ слэшем'
+        questions[0].save()
+        question_pool.invalidate()
+        with override_settings(SURVEYS_QUESTIONS_PER_SURVEY=12):
+            cls.survey = SimpleSurvey.objects.create(user=cls.user)
+
+    def setUp(self):
+        catalogue.clear()
+        get_cache().clear()
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_byte_identical(self):
+        survey = SimpleSurvey.objects.with_questions().get(pk=self.survey.pk)
+        loaded = fast_serializers.load(SimpleSurvey.objects.filter(pk=survey.pk))
+        self.assertEqual(
+            self.render(fast_serializers.survey_data(*loaded)), self.render(SimpleSurveySerializer(survey).data)
+        )
+        self.assertEqual(
+            self.render(fast_serializers.instance_data(survey)), self.render(SimpleSurveySerializer(survey).data)
+        )
+        survey.simple_survey_close()
+        loaded = fast_serializers.load(SimpleSurvey.objects.filter(pk=survey.pk))
+        self.assertEqual(
+            self.render(fast_serializers.survey_data(*loaded, with_right_answer=True)),
+            self.render(SimpleSurveyResSerializer(survey).data),
+        )
+
+    def test_views(self):
+        factory = APIRequestFactory()
+        for view_class, name in ((views.SimpleSurveyView, "edit_survey"), (views.SimpleSurveyResView, "survey_result")):
+            if name == "survey_result":
+                self.survey.simple_survey_close()
+            contents = []
+            for fast in (False, True):
+                get_cache().clear()
+                request = factory.get(reverse("surveys:{}".format(name), args=[self.survey.pk]))
+                force_authenticate(request, user=self.user)
+                response = view_class.as_view(fast_serialization=fast)(request, pk=self.survey.pk)
+                contents.append(response.render().content)
+            self.assertEqual(contents[0], contents[1])
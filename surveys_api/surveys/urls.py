@@ -1,22 +1,39 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
+from .async_views import hot_path_view
 from .views import DecoratedTokenObtainPairView, DecoratedTokenRefreshView
 
 app_name = "surveys"
 
+FAST_SERIALIZATION = getattr(settings, "SURVEYS_FAST_SERIALIZATION", False)
+
 urlpatterns = [
     path("auth/", DecoratedTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path(
         "auth/token_refresh/", DecoratedTokenRefreshView.as_view(), name="token_refresh"
     ),
-    path("surveys/<int:pk>/", views.SimpleSurveyView.as_view(), name="edit_survey"),
+    path("questions/stats/", views.QuestionStatsView.as_view(), name="question_stats"),
+    path("surveys/", views.SimpleSurveyListView.as_view(), name="survey_list"),
+    path(
+        "surveys/<int:pk>/",
+        hot_path_view(views.SimpleSurveyView, fast_serialization=FAST_SERIALIZATION),
+        name="edit_survey",
+    ),
+    path("results/export/", views.ResultExportView.as_view(), name="result_export"),
     path(
-        "results/<int:pk>/", views.SimpleSurveyResView.as_view(), name="survey_result"
+        "results/<int:pk>/",
+        hot_path_view(views.SimpleSurveyResView, fast_serialization=FAST_SERIALIZATION),
+        name="survey_result",
     ),
     path(
-        "surveys/create/", views.SimpleSurveyCreateView.as_view(), name="create_survey"
+        "surveys/create/",
+        hot_path_view(views.SimpleSurveyCreateView, fast_serialization=FAST_SERIALIZATION),
+        name="create_survey",
     ),
+    path("metrics/", views.metrics_view, name="metrics"),
+    path("users/me/surveys/", views.UserSurveyListView.as_view(), name="user_surveys"),
     path("users/create/", views.CustomUserCreate.as_view(), name="create_user"),
     path("users/<int:pk>/", views.CustomUser.as_view(), name="edit_user"),
 ]
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
@@ -33,15 +34,19 @@ ALLOWED_HOSTS = str(os.environ.get("DJANGO_ALLOWED_HOSTS")).split(" ")
 
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 
+TESTING = sys.argv[1:2] == ["test"]
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
     "formatters": {
         "console": {"format": "%(name)-12s %(levelname)-8s %(message)s"},
         "file": {"format": "%(asctime)s %(name)-12s %(levelname)-8s %(message)s"},
+        "json": {"format": "%(message)s"},
     },
     "handlers": {
         "console": {"class": "logging.StreamHandler", "formatter": "console"},
+        "metrics": {"class": "logging.StreamHandler", "formatter": "json"},
         "file": {
             "level": "INFO",
             "class": "logging.handlers.RotatingFileHandler",
@@ -55,7 +60,13 @@ LOGGING = {
         "": {
             "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
             "handlers": ["console", "file"],
-        }
+        },
+        "surveys.metrics": {
+            # В тестах строки запросов только засоряют вывод, остаются предупреждения о числе запросов.
+            "level": os.getenv("SURVEYS_METRICS_LOG_LEVEL", "WARNING" if TESTING else "INFO"),
+            "handlers": ["metrics"],
+            "propagate": False,
+        },
     },
 }
 # Application definition
@@ -69,12 +80,14 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     "rest_framework",
     "drf_yasg",
-    "surveys",
+    "surveys.apps.SurveysConfig",
 ]
 
 MIDDLEWARE = [
+    "surveys.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "surveys.middleware.AsyncWhiteNoiseMiddleware",
+    "surveys.middleware.ReplicaPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -103,12 +116,52 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "surveys_api.wsgi.application"
+ASGI_APPLICATION = "surveys_api.asgi.application"
+
+SURVEYS_ASYNC_VIEWS = int(os.environ.get("SURVEYS_ASYNC_VIEWS", default=0))
+# Число вопросов в опросе, если в админке не задан шаблон опроса по умолчанию.
+SURVEYS_QUESTIONS_PER_SURVEY = int(os.environ.get("SURVEYS_QUESTIONS_PER_SURVEY", default=3))
+# Отдавать опросы через surveys.fast_serializers вместо DRF-сериализаторов.
+SURVEYS_FAST_SERIALIZATION = int(os.environ.get("SURVEYS_FAST_SERIALIZATION", default=0))
+# Выдавать новые опросы из резерва, который пополняет команда fill_survey_pool.
+SURVEYS_PREBUILT_POOL = int(os.environ.get("SURVEYS_PREBUILT_POOL", default=0))
 
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
-DATABASES = {"default": dj_database_url.config(default=DATABASE_URL, conn_max_age=600)}
+DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL")
+DATABASE_CONN_MAX_AGE = int(os.environ.get("DATABASE_CONN_MAX_AGE", default=600))
+DATABASES = {"default": dj_database_url.config(default=DATABASE_URL, conn_max_age=DATABASE_CONN_MAX_AGE)}
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(DATABASE_REPLICA_URL, conn_max_age=DATABASE_CONN_MAX_AGE)
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["surveys.db_routers.ReplicaRouter"]
+SURVEYS_DB_REPLICA = "replica" if DATABASE_REPLICA_URL else None
+SURVEYS_DB_PIN_SECONDS = int(os.environ.get("SURVEYS_DB_PIN_SECONDS", default=5))
+# Закрепление за основной БД по id пользователя видно всем воркерам только с общим кэшем (Redis, Memcached).
+SURVEYS_DB_PIN_CACHE = os.environ.get("SURVEYS_DB_PIN_CACHE", "default")
+SURVEYS_DB_HEALTH_CHECKS = int(os.environ.get("SURVEYS_DB_HEALTH_CHECKS", default=0))
+
+SURVEYS_METRICS_ENDPOINT = int(os.environ.get("SURVEYS_METRICS_ENDPOINT", default=0))
+SURVEYS_METRICS_QUERY_WARNING = int(os.environ.get("SURVEYS_METRICS_QUERY_WARNING", default=20))
+SURVEYS_METRICS_TOKEN = os.environ.get("SURVEYS_METRICS_TOKEN", default="")
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
+SURVEYS_RESULT_CACHE = os.environ.get("SURVEYS_RESULT_CACHE", "default")
+SURVEYS_CATALOGUE_CACHE = os.environ.get("SURVEYS_CATALOGUE_CACHE", "default")
+# Снимок каталога вопросов перечитывается не реже этого интервала; с кэшем в памяти
+# процесса это единственный способ донести правки банка вопросов до других воркеров.
+SURVEYS_CATALOGUE_TIMEOUT = int(os.environ.get("SURVEYS_CATALOGUE_TIMEOUT", default=60))
+SURVEYS_AUTH_USER_CACHE_TIMEOUT = int(os.environ.get("SURVEYS_AUTH_USER_CACHE_TIMEOUT", default=60))
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -130,9 +183,13 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "surveys.authentication.StatelessJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "surveys.metrics.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 SIMPLE_JWT = {
@@ -180,6 +237,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+DEFAULT_FILE_STORAGE = "surveys.storage.HashedMediaStorage"
+# Раздавать MEDIA_ROOT через WhiteNoise; отключите, если загрузки отдает nginx или CDN.
+SURVEYS_SERVE_MEDIA = int(os.environ.get("SURVEYS_SERVE_MEDIA", default=1))
+
+SURVEYS_IMAGE_RENDITION_WIDTHS = (160, 480, 960)
+SURVEYS_IMAGE_RENDITION_FORMATS = ("webp", "jpeg")
+SURVEYS_IMAGE_RENDITION_QUALITY = 80
+SURVEYS_IMAGE_RENDITION_WORKERS = int(os.environ.get("SURVEYS_IMAGE_RENDITION_WORKERS", default=2))
 
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True